@@ -0,0 +1,174 @@
+"""Sample data shared by the PDF generator and the benchmarks of the functions.
+
+This module has no dependency on ReportLab so the contract metadata can be
+generated without rendering the PDFs.
+"""
+from datetime import datetime, timedelta
+import random
+import os
+
+# Sample data for generating contracts
+COMPANIES = [
+    {"name": "Contoso Corporation", "rep": "Angel Brown", "title": "CTO", 
+     "address": "1 Microsoft Way, Redmond, Washington, 98058",
+     "reference": "Contoso"},
+    {"name": "Fabrikam Inc", "rep": "Sarah Johnson", "title": "VP Operations",
+     "address": "123 Tech Drive, Seattle, Washington, 98101",
+     "reference": "Fabrikam"},
+    {"name": "Northwind Traders", "rep": "Michael Chen", "title": "Director",
+     "address": "456 Commerce Street, Bellevue, Washington, 98004",
+     "reference": "Northwind"},
+    {"name": "Fourth Coffee", "rep": "Emily Davis", "title": "CFO",
+     "address": "789 Business Ave, Tacoma, Washington, 98402",
+     "reference": "FourthCoffee"},
+    {"name": "Woodgrove Bank", "rep": "Robert Taylor", "title": "Operations Manager",
+     "address": "555 Finance Plaza, Redmond, Washington, 98052",
+     "reference": "Woodgrove"},
+]
+
+VENDORS = [
+    {"name": "AdventureWorks Cycles", "rep": "Aaron Smith", "title": "Sales Manager",
+     "address": "98 NW 76st Street, Suite 54, Bellevue, Washington, 98007",
+     "reference": "AdventureWorks"},
+    {"name": "TechServe Solutions", "rep": "David Martinez", "title": "Account Manager",
+     "address": "321 Service Road, Redmond, Washington, 98052",
+     "reference": "TechServe"},
+    {"name": "CloudHost Systems", "rep": "Lisa Anderson", "title": "Business Development",
+     "address": "654 Cloud Lane, Seattle, Washington, 98103",
+     "reference": "CloudHost"},
+    {"name": "DataCenter Pro", "rep": "James Wilson", "title": "Director of Sales",
+     "address": "987 Server Drive, Suite 200, Kirkland, Washington, 98033",
+     "reference": "DataCenter"},
+    {"name": "Alpine Ski House", "rep": "Patricia Moore", "title": "General Manager",
+     "address": "777 Mountain Road, Bellevue, Washington, 98006",
+     "reference": "Alpine"},
+]
+
+CONTRACT_TYPES = [
+    {
+        "title": "WEB HOSTING AGREEMENT",
+        "type": "hosting",
+        "services": "web hosting services",
+        "jurisdiction_region": "Washington",
+        "jurisdiction_clause": "This Agreement shall be governed by and construed in accordance with the internal laws of the State of Washington applicable to agreements made and to be performed entirely within such state."
+    },
+    {
+        "title": "CLOUD SERVICES AGREEMENT",
+        "type": "cloud",
+        "services": "cloud computing and storage services",
+        "jurisdiction_region": "Washington",
+        "jurisdiction_clause": "This Agreement shall be governed by and construed in accordance with the internal laws of the State of Washington applicable to agreements made and to be performed entirely within such state."
+    },
+    {
+        "title": "SOFTWARE LICENSE AGREEMENT",
+        "type": "license",
+        "services": "software licensing and support services",
+        "jurisdiction_region": "California",
+        "jurisdiction_clause": "This Agreement shall be governed by and construed in accordance with the internal laws of the State of California applicable to agreements made and to be performed entirely within such state."
+    },
+    {
+        "title": "MAINTENANCE AND SUPPORT AGREEMENT",
+        "type": "support",
+        "services": "technical support and maintenance services",
+        "jurisdiction_region": "Washington",
+        "jurisdiction_clause": "This Agreement shall be governed by and construed in accordance with the internal laws of the State of Washington applicable to agreements made and to be performed entirely within such state."
+    },
+    {
+        "title": "DATA PROCESSING AGREEMENT",
+        "type": "data",
+        "services": "data processing and analytics services",
+        "jurisdiction_region": "New York",
+        "jurisdiction_clause": "This Agreement shall be governed by and construed in accordance with the internal laws of the State of New York applicable to agreements made and to be performed entirely within such state."
+    },
+]
+
+
+def generate_contract_dates(rng=random, reference_date=None):
+    """Generate random contract dates: execution, effective, expiration, and renewal"""
+    # Execution date (when contract was signed) - within the 3 years before the reference date
+    days_ago = rng.randint(0, 1095)
+    execution_date = (reference_date or datetime.now()) - timedelta(days=days_ago)
+    
+    # Effective date: 0-30 days after execution
+    days_after_execution = rng.randint(0, 30)
+    effective_date = execution_date + timedelta(days=days_after_execution)
+    
+    # Contract duration: 12, 24, or 36 months
+    contract_duration_months = rng.choice([12, 24, 36])
+    
+    # Expiration date: calculated from effective date
+    expiration_date = effective_date + timedelta(days=contract_duration_months * 30)
+    
+    # Renewal date: 30-90 days before expiration
+    days_before_expiration = rng.randint(30, 90)
+    renewal_date = expiration_date - timedelta(days=days_before_expiration)
+    
+    return execution_date, effective_date, expiration_date, renewal_date, contract_duration_months
+
+
+def generate_contract(index, output_dir, rng=random, reference_date=None):
+    """Pick the parties, type, dates and identifiers of the contract number `index` (0-based)"""
+    # Randomly select company, vendor, and contract type
+    company = rng.choice(COMPANIES)
+    vendor = rng.choice(VENDORS)
+    
+    # Ensure company and vendor are different
+    while company['name'] == vendor['name']:
+        vendor = rng.choice(VENDORS)
+    
+    contract_type = CONTRACT_TYPES[index % len(CONTRACT_TYPES)]
+    execution_date, effective_date, expiration_date, renewal_date, contract_duration = generate_contract_dates(rng, reference_date)
+    
+    # Generate unique contract ID
+    contract_id = f"CTR-{contract_type['type'].upper()}-{effective_date.strftime('%Y%m%d')}-{rng.randint(1000, 9999)}"
+    
+    # Generate filename with contract type
+    filename = os.path.join(
+        output_dir, 
+        f"contract_{index+1:03d}_{contract_type['type']}_{company['reference']}_{effective_date.strftime('%Y%m%d')}.pdf"
+    )
+
+    return {
+        "filename": filename,
+        "company": company,
+        "vendor": vendor,
+        "contract_type": contract_type,
+        "effective_date": effective_date,
+        "expiration_date": expiration_date,
+        "execution_date": execution_date,
+        "renewal_date": renewal_date,
+        "contract_duration": contract_duration,
+        "contract_id": contract_id
+    }
+
+
+def build_contract_metadata(filename, company, vendor, contract_type, effective_date, expiration_date,
+                            execution_date, renewal_date, contract_duration, contract_id):
+    """Metadata of a generated contract (matching Azure Search schema)"""
+    return {
+        "filename": filename,
+        "id": contract_id,
+        "docType": "contract",
+        "title": contract_type["title"],
+        "contractId": contract_id,
+        "executionDate": execution_date.strftime("%Y-%m-%d"),
+        "effectiveDate": effective_date.strftime("%Y-%m-%d"),
+        "expirationDate": expiration_date.strftime("%Y-%m-%d"),
+        "contractDuration": f"{contract_duration} months",
+        "renewalDate": renewal_date.strftime("%Y-%m-%d"),
+        "parties": [
+            {
+                "name": company['name'],
+                "address": company['address'],
+                "referenceName": company['reference'],
+                "clause": f"{company['name']}, a Washington corporation, having its principal place of business at {company['address']} (\"{company['reference']}\")"
+            },
+            {
+                "name": vendor['name'],
+                "address": vendor['address'],
+                "referenceName": vendor['reference'],
+                "clause": f"{vendor['name']}, a Washington corporation, having its principal place of business at {vendor['address']} (\"{vendor['reference']}\")"
+            }
+        ],
+        "jurisdictions": [contract_type["jurisdiction_region"]]
+    }
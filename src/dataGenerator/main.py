@@ -3,121 +3,38 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_JUSTIFY
-from datetime import datetime, timedelta
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+from contract_data import generate_contract, build_contract_metadata
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from functools import partial
+import argparse
 import random
+import json
+import time
 import os
 
-# Sample data for generating contracts
-COMPANIES = [
-    {"name": "Contoso Corporation", "rep": "Angel Brown", "title": "CTO", 
-     "address": "1 Microsoft Way, Redmond, Washington, 98058",
-     "reference": "Contoso"},
-    {"name": "Fabrikam Inc", "rep": "Sarah Johnson", "title": "VP Operations",
-     "address": "123 Tech Drive, Seattle, Washington, 98101",
-     "reference": "Fabrikam"},
-    {"name": "Northwind Traders", "rep": "Michael Chen", "title": "Director",
-     "address": "456 Commerce Street, Bellevue, Washington, 98004",
-     "reference": "Northwind"},
-    {"name": "Fourth Coffee", "rep": "Emily Davis", "title": "CFO",
-     "address": "789 Business Ave, Tacoma, Washington, 98402",
-     "reference": "FourthCoffee"},
-    {"name": "Woodgrove Bank", "rep": "Robert Taylor", "title": "Operations Manager",
-     "address": "555 Finance Plaza, Redmond, Washington, 98052",
-     "reference": "Woodgrove"},
-]
+try:
+    import uploader
+except ImportError:
+    # azure-storage-blob is only needed to upload the contracts
+    uploader = None
 
-VENDORS = [
-    {"name": "AdventureWorks Cycles", "rep": "Aaron Smith", "title": "Sales Manager",
-     "address": "98 NW 76st Street, Suite 54, Bellevue, Washington, 98007",
-     "reference": "AdventureWorks"},
-    {"name": "TechServe Solutions", "rep": "David Martinez", "title": "Account Manager",
-     "address": "321 Service Road, Redmond, Washington, 98052",
-     "reference": "TechServe"},
-    {"name": "CloudHost Systems", "rep": "Lisa Anderson", "title": "Business Development",
-     "address": "654 Cloud Lane, Seattle, Washington, 98103",
-     "reference": "CloudHost"},
-    {"name": "DataCenter Pro", "rep": "James Wilson", "title": "Director of Sales",
-     "address": "987 Server Drive, Suite 200, Kirkland, Washington, 98033",
-     "reference": "DataCenter"},
-    {"name": "Alpine Ski House", "rep": "Patricia Moore", "title": "General Manager",
-     "address": "777 Mountain Road, Bellevue, Washington, 98006",
-     "reference": "Alpine"},
-]
+UPLOAD_EXTRA_MISSING = "--upload requires the upload extra, install it with: uv sync --extra upload"
 
-CONTRACT_TYPES = [
-    {
-        "title": "WEB HOSTING AGREEMENT",
-        "type": "hosting",
-        "services": "web hosting services",
-        "jurisdiction_region": "Washington",
-        "jurisdiction_clause": "This Agreement shall be governed by and construed in accordance with the internal laws of the State of Washington applicable to agreements made and to be performed entirely within such state."
-    },
-    {
-        "title": "CLOUD SERVICES AGREEMENT",
-        "type": "cloud",
-        "services": "cloud computing and storage services",
-        "jurisdiction_region": "Washington",
-        "jurisdiction_clause": "This Agreement shall be governed by and construed in accordance with the internal laws of the State of Washington applicable to agreements made and to be performed entirely within such state."
-    },
-    {
-        "title": "SOFTWARE LICENSE AGREEMENT",
-        "type": "license",
-        "services": "software licensing and support services",
-        "jurisdiction_region": "California",
-        "jurisdiction_clause": "This Agreement shall be governed by and construed in accordance with the internal laws of the State of California applicable to agreements made and to be performed entirely within such state."
-    },
-    {
-        "title": "MAINTENANCE AND SUPPORT AGREEMENT",
-        "type": "support",
-        "services": "technical support and maintenance services",
-        "jurisdiction_region": "Washington",
-        "jurisdiction_clause": "This Agreement shall be governed by and construed in accordance with the internal laws of the State of Washington applicable to agreements made and to be performed entirely within such state."
-    },
-    {
-        "title": "DATA PROCESSING AGREEMENT",
-        "type": "data",
-        "services": "data processing and analytics services",
-        "jurisdiction_region": "New York",
-        "jurisdiction_clause": "This Agreement shall be governed by and construed in accordance with the internal laws of the State of New York applicable to agreements made and to be performed entirely within such state."
-    },
-]
+_CONTRACT_STYLES = None
 
 
-def generate_contract_dates():
-    """Generate random contract dates: execution, effective, expiration, and renewal"""
-    # Execution date (when contract was signed) - within the last 3 years
-    days_ago = random.randint(0, 1095)
-    execution_date = datetime.now() - timedelta(days=days_ago)
-    
-    # Effective date: 0-30 days after execution
-    days_after_execution = random.randint(0, 30)
-    effective_date = execution_date + timedelta(days=days_after_execution)
-    
-    # Contract duration: 12, 24, or 36 months
-    contract_duration_months = random.choice([12, 24, 36])
-    
-    # Expiration date: calculated from effective date
-    expiration_date = effective_date + timedelta(days=contract_duration_months * 30)
-    
-    # Renewal date: 30-90 days before expiration
-    days_before_expiration = random.randint(30, 90)
-    renewal_date = expiration_date - timedelta(days=days_before_expiration)
-    
-    return execution_date, effective_date, expiration_date, renewal_date, contract_duration_months
+def get_contract_styles():
+    """Paragraph styles and colors of the contracts, built once per process"""
+    global _CONTRACT_STYLES
+    if _CONTRACT_STYLES is None:
+        _CONTRACT_STYLES = build_contract_styles()
+    return _CONTRACT_STYLES
 
 
-def create_contract_pdf(filename, company, vendor, contract_type, effective_date, expiration_date, 
-                       execution_date, renewal_date, contract_duration, contract_id):
-    """Generate a PDF contract with all required fields"""
-    doc = SimpleDocTemplate(filename, pagesize=letter,
-                          rightMargin=0.5*inch, leftMargin=0.5*inch,
-                          topMargin=0.5*inch, bottomMargin=0.5*inch)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Define styles with colors
+def build_contract_styles():
+    """Build the paragraph styles and colors of the contracts"""
     styles = getSampleStyleSheet()
     
     # Define color scheme - using blue tones like the sample
@@ -165,6 +82,42 @@ def create_contract_pdf(filename, company, vendor, contract_type, effective_date
         fontName='Helvetica-Bold'
     )
     
+    return {
+        'primary_color': primary_color,
+        'accent_color': accent_color,
+        'highlight_color': highlight_color,
+        'title': title_style,
+        'body': body_style,
+        'signature': signature_style,
+        'section_header': section_header_style,
+    }
+
+
+def create_contract_pdf(filename, company, vendor, contract_type, effective_date, expiration_date, 
+                       execution_date, renewal_date, contract_duration, contract_id,
+                       rng=random, single_page=False, invariant=False):
+    """Generate a PDF contract with all required fields
+
+    `single_page` only renders the paragraphs holding the extracted fields, for throughput runs.
+    `invariant` drops the creation date and random ids of the PDF so seeded runs are byte-identical.
+    """
+    doc = SimpleDocTemplate(filename, pagesize=letter,
+                          rightMargin=0.5*inch, leftMargin=0.5*inch,
+                          topMargin=0.5*inch, bottomMargin=0.5*inch,
+                          invariant=1 if invariant else None)
+    
+    # Container for the 'Flowable' objects
+    elements = []
+    
+    # Styles are built once per process
+    styles = get_contract_styles()
+    primary_color = styles['primary_color']
+    accent_color = styles['accent_color']
+    highlight_color = styles['highlight_color']
+    title_style = styles['title']
+    body_style = styles['body']
+    signature_style = styles['signature']
+    
     # Title with colored background
     title_text = f'<para align="center" backColor="{primary_color.hexval()}" ' \
                  f'textColor="white" spaceAfter="6" spaceBefore="6">' \
@@ -203,46 +156,48 @@ def create_contract_pdf(filename, company, vendor, contract_type, effective_date
     elements.append(Paragraph(term_text, body_style))
     elements.append(Spacer(1, 0.08*inch))
     
-    # Terms paragraph
-    terms_text = f"""This agreement shall void and nullify any and all previous agreements to this 
-    date between <font color="{primary_color.hexval()}"><b>{company['reference']}</b></font> and <font color="{primary_color.hexval()}"><b>{vendor['reference']}</b></font>."""
-    elements.append(Paragraph(terms_text, body_style))
-    elements.append(Spacer(1, 0.08*inch))
-    
-    # Generate dynamic contract terms
-    access_limit = random.randint(200000, 600000)
-    overage_fee = round(random.uniform(0.005, 0.02), 3)
-    response_time = random.choice(["24 hours", "12 hours", "48 hours"])
-    
-    # Fees paragraph with colored highlights
-    fees_text = f"""There shall be no additional fees of any kind paid to <font color="{primary_color.hexval()}"><b>{company['reference']}</b></font>, 
-    other than those listed within this agreement for <font color="{accent_color.hexval()}"><b>{contract_type['services']}</b></font> and/or bandwidth usage. 
-    The initial term of this contract is for <b>{contract_duration} months</b> with a maximum of 
-    <font color="{highlight_color.hexval()}"><b>{access_limit:,}</b></font> accesses thereafter payment shall be <font color="{highlight_color.hexval()}"><b>${overage_fee}</b></font> 
-    (one-half cent) per access. <font color="{primary_color.hexval()}"><b>{vendor['reference']}</b></font> must monitor and remit this amount to 
-    <font color="{primary_color.hexval()}"><b>{company['reference']}</b></font> by no later than Wednesday for accesses used from the previous week 
-    (Monday thru Sunday)."""
-    elements.append(Paragraph(fees_text, body_style))
-    elements.append(Spacer(1, 0.08*inch))
-    
-    # Support paragraph with colored highlights
-    support_text = f"""<font color="{primary_color.hexval()}"><b>{company['reference']}</b></font> must provide a person(s) to correct any technical 
-    problems (Server being down or slow, <font color="{accent_color.hexval()}"><b>{response_time}</b></font> per day, 7 days per week. 
-    This person(s) must be available by beeper or telephone. <font color="{primary_color.hexval()}"><b>{vendor['reference']}</b></font> shall provide 
-    this same 24 hour support at the broadcast location."""
-    elements.append(Paragraph(support_text, body_style))
-    elements.append(Spacer(1, 0.08*inch))
+    if not single_page:
+        # Terms paragraph
+        terms_text = f"""This agreement shall void and nullify any and all previous agreements to this 
+        date between <font color="{primary_color.hexval()}"><b>{company['reference']}</b></font> and <font color="{primary_color.hexval()}"><b>{vendor['reference']}</b></font>."""
+        elements.append(Paragraph(terms_text, body_style))
+        elements.append(Spacer(1, 0.08*inch))
+    
+        # Generate dynamic contract terms
+        access_limit = rng.randint(200000, 600000)
+        overage_fee = round(rng.uniform(0.005, 0.02), 3)
+        response_time = rng.choice(["24 hours", "12 hours", "48 hours"])
+    
+        # Fees paragraph with colored highlights
+        fees_text = f"""There shall be no additional fees of any kind paid to <font color="{primary_color.hexval()}"><b>{company['reference']}</b></font>, 
+        other than those listed within this agreement for <font color="{accent_color.hexval()}"><b>{contract_type['services']}</b></font> and/or bandwidth usage. 
+        The initial term of this contract is for <b>{contract_duration} months</b> with a maximum of 
+        <font color="{highlight_color.hexval()}"><b>{access_limit:,}</b></font> accesses thereafter payment shall be <font color="{highlight_color.hexval()}"><b>${overage_fee}</b></font> 
+        (one-half cent) per access. <font color="{primary_color.hexval()}"><b>{vendor['reference']}</b></font> must monitor and remit this amount to 
+        <font color="{primary_color.hexval()}"><b>{company['reference']}</b></font> by no later than Wednesday for accesses used from the previous week 
+        (Monday thru Sunday)."""
+        elements.append(Paragraph(fees_text, body_style))
+        elements.append(Spacer(1, 0.08*inch))
+    
+        # Support paragraph with colored highlights
+        support_text = f"""<font color="{primary_color.hexval()}"><b>{company['reference']}</b></font> must provide a person(s) to correct any technical 
+        problems (Server being down or slow, <font color="{accent_color.hexval()}"><b>{response_time}</b></font> per day, 7 days per week. 
+        This person(s) must be available by beeper or telephone. <font color="{primary_color.hexval()}"><b>{vendor['reference']}</b></font> shall provide 
+        this same 24 hour support at the broadcast location."""
+        elements.append(Paragraph(support_text, body_style))
+        elements.append(Spacer(1, 0.08*inch))
     
     # Governing law paragraph - Jurisdictions section with colored text
     gov_text = f"""<font color="{primary_color.hexval()}"><b>Governing Law:</b></font> {contract_type["jurisdiction_clause"]}"""
     elements.append(Paragraph(gov_text, body_style))
     elements.append(Spacer(1, 0.08*inch))
     
-    # Final agreement paragraph
-    final_text = f"""All parties have read and fully agree to all terms and conditions as set forth 
-    in this <font color="{accent_color.hexval()}"><b>{contract_type["title"].title()}</b></font>."""
-    elements.append(Paragraph(final_text, body_style))
-    elements.append(Spacer(1, 0.15*inch))
+    if not single_page:
+        # Final agreement paragraph
+        final_text = f"""All parties have read and fully agree to all terms and conditions as set forth 
+        in this <font color="{accent_color.hexval()}"><b>{contract_type["title"].title()}</b></font>."""
+        elements.append(Paragraph(final_text, body_style))
+        elements.append(Spacer(1, 0.15*inch))
     
     # Signature section with proper party names and colored styling
     sig_data = [
@@ -268,106 +223,133 @@ def create_contract_pdf(filename, company, vendor, contract_type, effective_date
     
     # Build PDF
     doc.build(elements)
-    print(f"Generated: {filename}")
     
     # Return contract metadata for logging (matching Azure Search schema)
-    return {
-        "filename": filename,
-        "id": contract_id,
-        "docType": "contract",
-        "title": contract_type["title"],
-        "contractId": contract_id,
-        "executionDate": execution_date.strftime("%Y-%m-%d"),
-        "effectiveDate": effective_date.strftime("%Y-%m-%d"),
-        "expirationDate": expiration_date.strftime("%Y-%m-%d"),
-        "contractDuration": f"{contract_duration} months",
-        "renewalDate": renewal_date.strftime("%Y-%m-%d"),
-        "parties": [
-            {
-                "name": company['name'],
-                "address": company['address'],
-                "referenceName": company['reference'],
-                "clause": f"{company['name']}, a Washington corporation, having its principal place of business at {company['address']} (\"{company['reference']}\")"
-            },
-            {
-                "name": vendor['name'],
-                "address": vendor['address'],
-                "referenceName": vendor['reference'],
-                "clause": f"{vendor['name']}, a Washington corporation, having its principal place of business at {vendor['address']} (\"{vendor['reference']}\")"
-            }
-        ],
-        "jurisdictions": [contract_type["jurisdiction_region"]]
-    }
+    return build_contract_metadata(filename, company, vendor, contract_type, effective_date, expiration_date,
+                                   execution_date, renewal_date, contract_duration, contract_id)
+
+
+def render_contract(index, output_dir, seed=None, reference_date=None, single_page=False):
+    """Pick and render the contract number `index`, seeded from (seed, index) so any worker gives the same contract"""
+    rng = random.Random(f"{seed}:{index}") if seed is not None else random.Random()
+    contract = generate_contract(index, output_dir, rng, reference_date)
+    return create_contract_pdf(**contract, rng=rng, single_page=single_page, invariant=seed is not None)
+
+
+def render_contracts(count, output_dir, workers=1, seed=None, reference_date=None, single_page=False):
+    """Render the contracts across a process pool, yielding their metadata in order"""
+    render = partial(render_contract, output_dir=output_dir, seed=seed,
+                     reference_date=reference_date, single_page=single_page)
+    if workers <= 1:
+        yield from map(render, range(count))
+        return
+    
+    # Each worker builds its styles once; chunks keep the inter-process overhead low
+    chunksize = max(1, min(64, count // (workers * 8)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=get_contract_styles) as executor:
+        yield from executor.map(render, range(count), chunksize=chunksize)
 
 
-def main():
+def print_contract_summary(number, metadata):
+    print(f"\nContract #{number}:")
+    print(f"  ID: {metadata['contractId']}")
+    print(f"  DocType: {metadata['docType']}")
+    print(f"  Title: {metadata['title']}")
+    print(f"  Execution Date: {metadata['executionDate']}")
+    print(f"  Effective Date: {metadata['effectiveDate']}")
+    print(f"  Expiration Date: {metadata['expirationDate']}")
+    print(f"  Renewal Date: {metadata['renewalDate']}")
+    print(f"  Duration: {metadata['contractDuration']}")
+    print(f"  Party 1: {metadata['parties'][0]['name']} ({metadata['parties'][0]['referenceName']})")
+    print(f"  Party 2: {metadata['parties'][1]['name']} ({metadata['parties'][1]['referenceName']})")
+    print(f"  Jurisdictions: {', '.join(metadata['jurisdictions'])}")
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Generate contract PDFs")
+    parser.add_argument("--count", type=int, default=None,
+                        help="number of contracts to generate (default: 8-12 at random)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed making the corpus reproducible, whatever the number of workers")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of rendering processes (0 = one per CPU)")
+    parser.add_argument("--output-dir", default="generated_contracts")
+    parser.add_argument("--reference-date", type=date.fromisoformat, default=None,
+                        help="date the contract dates are generated back from, YYYY-MM-DD (default: today)")
+    parser.add_argument("--single-page", action="store_true",
+                        help="only render the paragraphs holding the extracted fields")
+    parser.add_argument("--quiet", action="store_true",
+                        help="only print the progress and the final summary")
+    parser.add_argument("--manifest", default=None,
+                        help="JSONL ground truth of the contracts (default: <output-dir>/manifest.jsonl)")
+    parser.add_argument("--upload", action="store_true",
+                        help="upload the generated contracts to blob storage (requires the upload extra)")
+    if uploader:
+        uploader.add_upload_arguments(parser)
+        return parser.parse_args(argv)
+
+    # The options of the upload are only known with the upload extra
+    args, unknown = parser.parse_known_args(argv)
+    if args.upload:
+        parser.error(UPLOAD_EXTRA_MISSING)
+    if unknown:
+        parser.error(f"unrecognized arguments: {' '.join(unknown)}")
+    return args
+
+
+def iter_manifest_files(manifest_path):
+    """Files of the contracts listed in the manifest"""
+    with open(manifest_path, encoding="utf-8") as manifest:
+        for line in manifest:
+            if line.strip():
+                yield json.loads(line)["filename"]
+
+
+def main(argv=None):
     """Generate multiple contract PDFs"""
+    args = parse_arguments(argv)
     print("Starting contract PDF generation...")
     print("=" * 60)
     
     # Create output directory if it doesn't exist
-    output_dir = "generated_contracts"
+    output_dir = args.output_dir
     os.makedirs(output_dir, exist_ok=True)
     
-    # Generate 8-12 random contracts
-    num_contracts = random.randint(8, 12)
-    
-    contracts_metadata = []
-    
-    for i in range(num_contracts):
-        # Randomly select company, vendor, and contract type
-        company = random.choice(COMPANIES)
-        vendor = random.choice(VENDORS)
-        
-        # Ensure company and vendor are different
-        while company['name'] == vendor['name']:
-            vendor = random.choice(VENDORS)
-        
-        contract_type = CONTRACT_TYPES[i % len(CONTRACT_TYPES)]
-        execution_date, effective_date, expiration_date, renewal_date, contract_duration = generate_contract_dates()
-        
-        # Generate unique contract ID
-        contract_id = f"CTR-{contract_type['type'].upper()}-{effective_date.strftime('%Y%m%d')}-{random.randint(1000, 9999)}"
-        
-        # Generate filename with contract type
-        filename = os.path.join(
-            output_dir, 
-            f"contract_{i+1:03d}_{contract_type['type']}_{company['reference']}_{effective_date.strftime('%Y%m%d')}.pdf"
-        )
-        
-        # Create the contract and get metadata
-        metadata = create_contract_pdf(
-            filename, company, vendor, contract_type, 
-            effective_date, expiration_date, execution_date, renewal_date, 
-            contract_duration, contract_id
-        )
-        contracts_metadata.append(metadata)
-        
-        # Print contract summary
-        print(f"\nContract #{i+1}:")
-        print(f"  ID: {metadata['contractId']}")
-        print(f"  DocType: {metadata['docType']}")
-        print(f"  Title: {metadata['title']}")
-        print(f"  Execution Date: {metadata['executionDate']}")
-        print(f"  Effective Date: {metadata['effectiveDate']}")
-        print(f"  Expiration Date: {metadata['expirationDate']}")
-        print(f"  Renewal Date: {metadata['renewalDate']}")
-        print(f"  Duration: {metadata['contractDuration']}")
-        print(f"  Party 1: {metadata['parties'][0]['name']} ({metadata['parties'][0]['referenceName']})")
-        print(f"  Party 2: {metadata['parties'][1]['name']} ({metadata['parties'][1]['referenceName']})")
-        print(f"  Jurisdictions: {', '.join(metadata['jurisdictions'])}")
+    # Generate 8-12 random contracts unless a count is given
+    num_contracts = args.count if args.count is not None else random.Random(args.seed).randint(8, 12)
+    workers = args.workers or os.cpu_count()
+    reference_date = datetime.combine(args.reference_date, datetime.min.time()) if args.reference_date else None
+    progress_every = max(1, num_contracts // 20)
+    manifest_path = args.manifest or os.path.join(output_dir, "manifest.jsonl")
+    
+    # The metadata is streamed to the manifest, only the counts are kept in memory
+    type_counts = {}
+    started_at = time.perf_counter()
+    contracts = render_contracts(num_contracts, output_dir, workers, args.seed, reference_date, args.single_page)
+    with open(manifest_path, "w", encoding="utf-8") as manifest:
+        for i, metadata in enumerate(contracts):
+            manifest.write(json.dumps(metadata) + "\n")
+            contract_title = metadata['title']
+            type_counts[contract_title] = type_counts.get(contract_title, 0) + 1
+            
+            if not args.quiet:
+                print(f"Generated: {metadata['filename']}")
+                print_contract_summary(i + 1, metadata)
+            elif (i + 1) % progress_every == 0:
+                print(f"  {i + 1}/{num_contracts} contracts")
+    elapsed = time.perf_counter() - started_at
     
     print("\n" + "=" * 60)
     print(f"Successfully generated {num_contracts} contracts in '{output_dir}' directory!")
+    print(f"Rendered in {elapsed:.1f}s with {workers} worker(s) ({num_contracts / elapsed:.1f} contracts/s)")
+    print(f"Ground truth written to '{manifest_path}'")
     print("\nContract Type Summary:")
-    type_counts = {}
-    for metadata in contracts_metadata:
-        # Extract type from title
-        contract_title = metadata['title']
-        type_counts[contract_title] = type_counts.get(contract_title, 0) + 1
-    
     for ctype, count in sorted(type_counts.items()):
         print(f"  {ctype}: {count} contract(s)")
+    
+    if args.upload:
+        print("\n" + "=" * 60)
+        uploader.run_upload(iter_manifest_files(manifest_path), args, args.quiet)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+"""Bulk upload of the generated contracts to the documents container.
+
+The PDFs are uploaded with a bounded number of concurrent blobs, each blob
+being split in blocks uploaded in parallel. Set ``BLOB_CONNECTION_STRING`` to
+use a connection string (e.g. ``UseDevelopmentStorage=true`` for Azurite),
+otherwise ``BLOB_ACCOUNT_URL`` is used with ``DefaultAzureCredential``.
+
+    python uploader.py generated_contracts --container documents --concurrency 16
+"""
+from azure.core.exceptions import ResourceExistsError
+from azure.storage.blob import ContentSettings
+from azure.storage.blob.aio import BlobServiceClient
+import argparse
+import asyncio
+import time
+import os
+
+PDF_CONTENT_SETTINGS = ContentSettings(content_type="application/pdf")
+
+
+def iter_contract_files(directory):
+    """PDFs of the directory, without listing the whole directory in memory"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(".pdf"):
+                yield entry.path
+
+
+def create_blob_service_client(account_url=None, connection_string=None):
+    connection_string = connection_string or os.getenv('BLOB_CONNECTION_STRING')
+    if connection_string:
+        return BlobServiceClient.from_connection_string(connection_string), None
+
+    account_url = account_url or os.getenv('BLOB_ACCOUNT_URL')
+    if not account_url:
+        raise ValueError("Set BLOB_CONNECTION_STRING or BLOB_ACCOUNT_URL to upload the contracts")
+
+    from azure.identity.aio import DefaultAzureCredential
+    credential = DefaultAzureCredential()
+    return BlobServiceClient(account_url, credential=credential), credential
+
+
+async def upload_contracts(paths, container_name="documents", account_url=None, connection_string=None,
+                           concurrency=8, max_concurrency=4, overwrite=True, on_uploaded=None):
+    """Upload the files under their base name, `concurrency` blobs at a time
+
+    `max_concurrency` is the number of blocks of a blob uploaded in parallel.
+    Returns the number of uploaded files and the number of bytes.
+    """
+    service_client, credential = create_blob_service_client(account_url, connection_string)
+    uploaded = 0
+    uploaded_bytes = 0
+
+    async def upload(path):
+        nonlocal uploaded, uploaded_bytes
+        with open(path, "rb") as data:
+            await container_client.upload_blob(
+                os.path.basename(path), data, overwrite=overwrite,
+                max_concurrency=max_concurrency, content_settings=PDF_CONTENT_SETTINGS)
+        uploaded += 1
+        uploaded_bytes += os.path.getsize(path)
+        if on_uploaded:
+            on_uploaded(path, uploaded)
+
+    try:
+        async with service_client:
+            container_client = service_client.get_container_client(container_name)
+            try:
+                await container_client.create_container()
+            except ResourceExistsError:
+                pass
+
+            # Only `concurrency` uploads are pending, the paths keep streaming from the generator
+            semaphore = asyncio.Semaphore(concurrency)
+            pending = set()
+            try:
+                for path in paths:
+                    await semaphore.acquire()
+                    # Stop at the first failed upload
+                    for task in [task for task in pending if task.done()]:
+                        pending.discard(task)
+                        task.result()
+                    task = asyncio.create_task(upload(path))
+                    task.add_done_callback(lambda _: semaphore.release())
+                    pending.add(task)
+                await asyncio.gather(*pending)
+            except BaseException:
+                for task in pending:
+                    task.cancel()
+                raise
+    finally:
+        if credential:
+            await credential.close()
+
+    return uploaded, uploaded_bytes
+
+
+def add_upload_arguments(parser):
+    parser.add_argument("--container", default="documents", help="destination container (default: documents)")
+    parser.add_argument("--account-url", default=None, help="storage account URL (default: BLOB_ACCOUNT_URL)")
+    parser.add_argument("--connection-string", default=None,
+                        help="storage connection string, e.g. UseDevelopmentStorage=true (default: BLOB_CONNECTION_STRING)")
+    parser.add_argument("--concurrency", type=int, default=8, help="blobs uploaded at the same time")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="blocks of a blob uploaded in parallel")
+
+
+def run_upload(paths, args, quiet=False):
+    """Upload the files with the options of `add_upload_arguments` and print a summary"""
+    def on_uploaded(path, count):
+        if not quiet:
+            print(f"Uploaded: {os.path.basename(path)}")
+        elif count % 1000 == 0:
+            print(f"  {count} contracts uploaded")
+
+    started_at = time.perf_counter()
+    uploaded, uploaded_bytes = asyncio.run(upload_contracts(
+        paths, args.container, args.account_url, args.connection_string,
+        args.concurrency, args.max_concurrency, on_uploaded=on_uploaded))
+    elapsed = time.perf_counter() - started_at
+    print(f"Uploaded {uploaded} contracts ({uploaded_bytes / 1024 / 1024:.1f} MB) to '{args.container}' "
+          f"in {elapsed:.1f}s ({uploaded / elapsed if elapsed else 0:.1f} contracts/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Upload the generated contracts to blob storage")
+    parser.add_argument("directory", nargs="?", default="generated_contracts")
+    parser.add_argument("--quiet", action="store_true")
+    add_upload_arguments(parser)
+    args = parser.parse_args(argv)
+    run_upload(iter_contract_files(args.directory), args, args.quiet)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Peak memory of the contract skill by batch size.
+
+Runs ``bench_pipeline`` with one skill request of each batch size in a fresh
+interpreter (the peak RSS of a process only grows) for every
+``MAX_BATCH_IN_FLIGHT`` value, and reports the peak RSS, the peak of the
+Python allocations and the size of the response.
+
+Run from ``src/functions``::
+
+    python -m benchmarks.bench_memory --records 1 100 1000 --in-flight 0 32 --clause-repeat 20
+"""
+from typing import Any, Dict
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+def run_once(records:int, in_flight:int, args:argparse.Namespace) -> Dict[str, Any]:
+    env = dict(os.environ, MAX_BATCH_IN_FLIGHT=str(in_flight))
+    # Only with a bounded MAX_BATCH_IN_FLIGHT, see function_app.py
+    if args.max_response_bytes and in_flight:
+        env["MAX_RESPONSE_BYTES"] = str(args.max_response_bytes)
+    command = [sys.executable, "-m", "benchmarks.bench_pipeline",
+               "--requests", "1", "--batch-size", str(records),
+               "--latency", str(args.latency), "--jitter", "0",
+               "--clause-repeat", str(args.clause_repeat), "--trace-memory"]
+    completed = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[1, 100, 1000], help="Records of the skill request")
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[0, 32], help="MAX_BATCH_IN_FLIGHT values (0 for all the records)")
+    parser.add_argument("--max-response-bytes", type=int, default=0, help="MAX_RESPONSE_BYTES of the runs with a MAX_BATCH_IN_FLIGHT (0 for no limit)")
+    parser.add_argument("--clause-repeat", type=int, default=10, help="Times the clause of each party is repeated")
+    parser.add_argument("--latency", type=float, default=0.1, help="Analysis latency of the stand-in in seconds")
+    args = parser.parse_args()
+
+    print(f"{'records':>8} {'in flight':>10} {'peak rss mb':>12} {'traced mb':>10} {'response mb':>12} {'seconds':>8}")
+    for records in args.records:
+        for in_flight in args.in_flight:
+            result = run_once(records, in_flight, args)
+            print(f"{records:>8} {in_flight or 'all':>10} {result['peak_rss_mb']:>12} {result.get('traced_peak_mb', ''):>10} "
+                  f"{result['response_bytes'] / 1024 / 1024:>12.2f} {result['seconds']:>8}")
+
+if __name__ == "__main__":
+    main()
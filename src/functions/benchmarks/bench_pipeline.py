@@ -0,0 +1,160 @@
+"""End-to-end throughput benchmark of the contract skill.
+
+Drives ``process_contract`` in-process with skill batches against the local
+Document Intelligence stand-in (``benchmarks/fake_doc_intelligence.py``) and
+reports docs/sec, the p50/p95/p99 latency of the skill requests and the memory
+used by the worker. No Azure resource is called: the blob URLs are only built,
+not downloaded, unless a feature that reads the blobs is enabled.
+
+Run from ``src/functions``::
+
+    python -m benchmarks.bench_pipeline --requests 20 --batch-size 10 --concurrency 4 --latency 1
+
+The Function App settings (``MAX_CONCURRENT_RECORDS``, ``DOC_POLLING_STRATEGY``...)
+are read from the environment as usual.
+"""
+from benchmarks.fake_doc_intelligence import add_arguments, config_from_arguments, start_server
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import time
+import tracemalloc
+
+
+class _QueueOutput:
+    def __init__(self):
+        self.messages:List[str] = []
+
+    def set(self, messages:List[str]):
+        self.messages.extend(messages)
+
+
+def generate_batches(requests:int, batch_size:int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "values": [
+                {
+                    "recordId": str(record),
+                    "data": {"metadata_storage_name": f"contract_{batch * batch_size + record + 1:06d}_bench.pdf"}
+                }
+                for record in range(batch_size)
+            ]
+        }
+        for batch in range(requests)
+    ]
+
+
+def load_batches(path:str) -> List[Dict[str, Any]]:
+    # A skill request body (JSON) or one body per line (JSONL)
+    with open(path, encoding="utf-8") as f:
+        content = f.read().strip()
+    if content.startswith("{") and "\n{" not in content:
+        return [json.loads(content)]
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+def percentile(values:List[float], percent:int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+async def run(batches:List[Dict[str, Any]], concurrency:int, trace_memory:bool) -> Dict[str, Any]:
+    # Imported once the environment points to the fake endpoint
+    import azure.functions as func
+    import function_app
+
+    process_contract = function_app.process_contract._function._func
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies:List[float] = []
+    errors = 0
+    response_bytes = 0
+
+    async def send(batch:Dict[str, Any]):
+        nonlocal errors, response_bytes
+        request = func.HttpRequest("POST", "/api/process", body=json.dumps(batch).encode("utf-8"))
+        async with semaphore:
+            started_at = time.perf_counter()
+            response = await process_contract(request, _QueueOutput())
+            latencies.append(time.perf_counter() - started_at)
+
+        body = response.get_body()
+        response_bytes += len(body)
+        errors += sum(1 for value in json.loads(body)["values"] if value.get("errors"))
+
+    if trace_memory:
+        tracemalloc.start()
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*[send(batch) for batch in batches])
+    elapsed = time.perf_counter() - started_at
+
+    traced_peak:Optional[int] = None
+    if trace_memory:
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    records = sum(len(batch["values"]) for batch in batches)
+    result = {
+        "requests": len(batches),
+        "records": records,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "docs_per_second": round(records / elapsed, 2),
+        "latency_p50": round(percentile(latencies, 50), 3),
+        "latency_p95": round(percentile(latencies, 95), 3),
+        "latency_p99": round(percentile(latencies, 99), 3),
+        "response_bytes": response_bytes,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "service": function_app.get_contract_service().stats(),
+    }
+    if traced_peak is not None:
+        result["traced_peak_mb"] = round(traced_peak / 1024 / 1024, 1)
+
+    await function_app.get_contract_service().close()
+    return result
+
+
+async def main_async(args:argparse.Namespace):
+    runner = None
+    endpoint = args.endpoint
+    if not endpoint:
+        runner, endpoint = await start_server(config_from_arguments(args))
+
+    os.environ["DOC_ENDPOINT"] = endpoint
+    os.environ.setdefault("DOC_API_KEY", "benchmark")
+    os.environ.setdefault("BLOB_ACCOUNT_URL", "https://benchmark.blob.core.windows.net")
+    os.environ.setdefault("CONTAINER_NAME", "documents")
+
+    batches = load_batches(args.batch_file) if args.batch_file else generate_batches(args.requests, args.batch_size)
+
+    try:
+        result = await run(batches, args.concurrency, args.trace_memory)
+        if runner:
+            result["fake_service"] = runner.app["service"].stats()
+    finally:
+        if runner:
+            await runner.cleanup()
+
+    print(json.dumps(result, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=10, help="Number of skill requests")
+    parser.add_argument("--batch-size", type=int, default=10, help="Records per skill request")
+    parser.add_argument("--batch-file", help="Skill request body (JSON) or bodies (JSONL) to send instead of generated batches")
+    parser.add_argument("--concurrency", type=int, default=1, help="Skill requests sent at the same time (indexer degreeOfParallelism)")
+    parser.add_argument("--trace-memory", action="store_true", help="Report the peak of the Python allocations (slower)")
+    parser.add_argument("--endpoint", help="Use this Document Intelligence endpoint instead of starting the fake one")
+    add_arguments(parser)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
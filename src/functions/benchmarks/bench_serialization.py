@@ -0,0 +1,81 @@
+"""Micro-benchmark of the skill request parsing and response serialization.
+
+Compares the original path (``req.get_json()`` + ``DocumentRequest(**body)``
+and ``model_dump_json(indent=4)``) with the cached TypeAdapter path and the
+compact / orjson response formats.
+
+Run from ``src/functions``::
+
+    python -m benchmarks.bench_serialization
+"""
+from models import Contract, ContractFields, Party
+from request import DocumentOutput, DocumentRequest, parse_document_request, serialize_output
+from request.serialization import RESPONSE_FORMATS, orjson
+from datetime import datetime, timezone
+import argparse
+import json
+import timeit
+
+CLAUSE = ("Contoso Corporation, a Washington corporation, having its principal place of business at "
+          "1 Microsoft Way, Redmond, Washington, 98058 (\"Contoso\") ") * 4
+
+def build_request(records:int) -> bytes:
+    return json.dumps({
+        "values": [
+            {"recordId": str(i), "data": {"metadata_storage_name": f"contract_{i:06d}_hosting_Contoso_20250819.pdf"}}
+            for i in range(records)
+        ]
+    }).encode('utf-8')
+
+def build_output(records:int) -> DocumentOutput:
+    parties = [
+        Party(name="Contoso Corporation", address="1 Microsoft Way, Redmond, Washington, 98058",
+              referenceName="Contoso", clause=CLAUSE),
+        Party(name="AdventureWorks Cycles", address="98 NW 76st Street, Suite 54, Bellevue, Washington, 98007",
+              referenceName="AdventureWorks", clause=CLAUSE),
+    ]
+    fields = ContractFields(
+        docType="contract", title="WEB HOSTING AGREEMENT", contractId="CTR-HOSTING-20250819-1234",
+        parties=parties, executionDate="August 19, 2025", effectiveDate="19 day of August, 2025",
+        expirationDate="August 14, 2026", contractDuration="12 months", renewalDate="June 1, 2026",
+        executionDateValue=datetime(2025, 8, 19, tzinfo=timezone.utc), effectiveDateValue=datetime(2025, 8, 19, tzinfo=timezone.utc),
+        expirationDateValue=datetime(2026, 8, 14, tzinfo=timezone.utc), renewalDateValue=datetime(2026, 6, 1, tzinfo=timezone.utc),
+        contractDurationMonths=12, jurisdictions=["Washington"]
+    )
+    return DocumentOutput(values=[Contract(recordId=str(i), data=fields) for i in range(records)])
+
+def parse_original(body:bytes) -> DocumentRequest:
+    return DocumentRequest(**json.loads(body))
+
+def measure(fn, number:int) -> float:
+    # Best of 3, in microseconds per call
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[1, 50, 500])
+    args = parser.parse_args()
+
+    print(f"{'records':>8} {'step':<28} {'us/call':>12} {'bytes':>10} {'speedup':>8}")
+    for records in args.records:
+        number = max(5, 5000 // records)
+        body = build_request(records)
+        output = build_output(records)
+
+        baseline = measure(lambda: parse_original(body), number)
+        print(f"{records:>8} {'parse: DocumentRequest(**)':<28} {baseline:>12.1f} {len(body):>10}")
+        elapsed = measure(lambda: parse_document_request(body), number)
+        print(f"{records:>8} {'parse: TypeAdapter':<28} {elapsed:>12.1f} {len(body):>10} {baseline / elapsed:>7.1f}x")
+
+        baseline = measure(lambda: output.model_dump_json(indent=4, by_alias=True), number)
+        size = len(output.model_dump_json(indent=4, by_alias=True))
+        print(f"{records:>8} {'dump: model_dump_json(4)':<28} {baseline:>12.1f} {size:>10}")
+        for response_format in RESPONSE_FORMATS:
+            if response_format == "orjson" and orjson is None:
+                continue
+            elapsed = measure(lambda: serialize_output(output, response_format), number)
+            size = len(serialize_output(output, response_format))
+            print(f"{records:>8} {'dump: ' + response_format:<28} {elapsed:>12.1f} {size:>10} {baseline / elapsed:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Cold-start benchmark of the function app.
+
+Imports ``function_app`` in a fresh interpreter for each ``STARTUP_MODE``
+(``eager``, ``lazy``, ``preload``) and reports the import time of the app,
+the time of the first call to the contract service and the modules that are
+the slowest to import (``python -X importtime``). No Azure resource is
+called: the clients are only built.
+
+Run from ``src/functions``::
+
+    python -m benchmarks.bench_startup --runs 5 --top 15
+"""
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Run in the child interpreter, the service is built as by the first request
+CHILD = """
+import json, time
+started_at = time.perf_counter()
+import function_app
+imported_at = time.perf_counter()
+function_app.get_contract_service()
+print(json.dumps({"import": imported_at - started_at, "first_call": time.perf_counter() - imported_at}))
+"""
+
+def run_once(mode:str, import_time:bool) -> Tuple[Dict[str, float], str]:
+    env = dict(os.environ,
+               STARTUP_MODE=mode,
+               DOC_ENDPOINT=os.getenv('DOC_ENDPOINT', 'http://localhost:5050'),
+               DOC_API_KEY=os.getenv('DOC_API_KEY', 'benchmark'),
+               BLOB_ACCOUNT_URL=os.getenv('BLOB_ACCOUNT_URL', 'https://benchmark.blob.core.windows.net'),
+               TELEMETRY_EXPORTER='none')
+    command = [sys.executable] + (["-X", "importtime"] if import_time else []) + ["-c", CHILD]
+    completed = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+def slowest_imports(importtime_output:str, top:int) -> List[Tuple[int, str]]:
+    # import time: self [us] | cumulative | imported package
+    modules = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # The app and the modules it imports, their children are part of the
+        # cumulative time
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth > 1:
+            continue
+        modules.append((int(cumulative), name.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["eager", "lazy", "preload"])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per mode")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports reported (0 to skip -X importtime)")
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'import p50 ms':>14} {'first call p50 ms':>18} {'total p50 ms':>13}")
+    for mode in args.modes:
+        runs = [run_once(mode, import_time=False)[0] for _ in range(args.runs)]
+        import_ms = statistics.median(run["import"] for run in runs) * 1000
+        first_call_ms = statistics.median(run["first_call"] for run in runs) * 1000
+        total_ms = statistics.median(run["import"] + run["first_call"] for run in runs) * 1000
+        print(f"{mode:<8} {import_ms:>14.1f} {first_call_ms:>18.1f} {total_ms:>13.1f}")
+
+    if args.top:
+        # The eager mode imports everything on the main thread
+        _, importtime_output = run_once("eager", import_time=True)
+        print(f"\n{'cumulative ms':>14}  slowest imports of the app (eager)")
+        for cumulative, name in slowest_imports(importtime_output, args.top):
+            print(f"{cumulative / 1000:>14.1f}  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Extraction accuracy and throughput against the ground truth of the data generator.
+
+Extracts the fields of every contract listed in the generator manifest
+(``manifest.jsonl``) and compares them, column by column, to the metadata of
+the generator. Reports the precision and recall of each field next to the
+docs/sec of the extraction, so a faster extraction path can be checked to
+extract the same fields.
+
+The fields come from one of:
+
+- ``ContractService`` (default), against ``--endpoint`` or the local Document
+  Intelligence stand-in started on the manifest;
+- ``--responses DIR``, recorded analyze responses named ``<blob name>.json``
+  (the operation status or the ``analyzeResult`` itself), only running the
+  field extraction.
+
+Run from ``src/functions`` (needs ``benchmarks/requirements.txt``)::
+
+    python -m benchmarks.evaluate_extraction ../dataGenerator/generated_contracts/manifest.jsonl --concurrency 32 --latency 0.2
+"""
+from benchmarks.fake_doc_intelligence import add_arguments, config_from_arguments, start_server
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+
+SCALAR_FIELDS = ["docType", "title", "contractId", "executionDate", "effectiveDate",
+                 "expirationDate", "renewalDate", "contractDuration"]
+DATE_FIELDS = ["executionDate", "effectiveDate", "expirationDate", "renewalDate"]
+LIST_FIELDS = ["parties", "jurisdictions"]
+
+
+def load_manifest(path:str, limit:Optional[int]=None) -> List[Dict[str, Any]]:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+                if limit and len(records) >= limit:
+                    break
+    return records
+
+
+def to_frame(records:Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    """One row per document, one column per field; list fields hold the list of values"""
+    frame = pd.DataFrame.from_dict(records, orient="index")
+    frame = frame.reindex(columns=SCALAR_FIELDS + LIST_FIELDS)
+    frame["parties"] = frame["parties"].map(
+        lambda parties: [party.get("name") for party in parties] if isinstance(parties, list) else [])
+    frame["jurisdictions"] = frame["jurisdictions"].map(
+        lambda values: values if isinstance(values, list) else [])
+    return frame
+
+
+def normalize_text(values:pd.Series) -> pd.Series:
+    return (values.astype("string")
+                  .str.lower()
+                  .str.replace(r"[^\w\s]", " ", regex=True)
+                  .str.replace(r"\s+", " ", regex=True)
+                  .str.strip()
+                  .replace("", pd.NA))
+
+
+def normalize_scalar(field:str, values:pd.Series) -> pd.Series:
+    if field in DATE_FIELDS:
+        # Dates are extracted as written, e.g. "24th day of May, 2025"
+        values = values.astype("string").str.replace(r"(\d+)(?:st|nd|rd|th)?\s+day\s+of\s+", r"\1 ", regex=True)
+        dates = pd.to_datetime(values, errors="coerce", format="mixed")
+        return dates.dt.strftime("%Y-%m-%d").astype("string")
+    return normalize_text(values)
+
+
+def compare(expected:pd.DataFrame, extracted:pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Per-field metrics and the per-document matches of the scalar fields"""
+    extracted = extracted.reindex(expected.index)
+    metrics = {}
+    matches = pd.DataFrame(index=expected.index)
+
+    for field in SCALAR_FIELDS:
+        truth = normalize_scalar(field, expected[field])
+        found = normalize_scalar(field, extracted[field])
+        has_truth = truth.notna().to_numpy()
+        has_found = found.notna().to_numpy()
+        correct = has_truth & has_found & (truth.fillna("") == found.fillna("")).to_numpy()
+        matches[field] = np.where(correct, True, np.where(has_truth | has_found, False, np.nan))
+        metrics[field] = (correct.sum(), has_found.sum(), has_truth.sum())
+
+    # List fields are compared as sets of (document, normalized value) pairs
+    for field in LIST_FIELDS:
+        truth = _pairs(expected[field])
+        found = _pairs(extracted[field].map(lambda values: values if isinstance(values, list) else []))
+        correct = len(truth.merge(found, how="inner"))
+        metrics[field] = (correct, len(found), len(truth))
+
+    report = pd.DataFrame.from_dict(metrics, orient="index", columns=["correct", "extracted", "expected"])
+    report["precision"] = report["correct"] / report["extracted"].replace(0, np.nan)
+    report["recall"] = report["correct"] / report["expected"].replace(0, np.nan)
+    report["f1"] = 2 * report["precision"] * report["recall"] / (report["precision"] + report["recall"])
+    return report, matches
+
+
+def _pairs(values:pd.Series) -> pd.DataFrame:
+    exploded = values.explode().dropna()
+    pairs = pd.DataFrame({"document": exploded.index, "value": normalize_text(exploded).to_numpy()})
+    return pairs.dropna().drop_duplicates()
+
+
+async def extract_with_service(names:List[str], concurrency:int) -> Tuple[Dict[str, Dict[str, Any]], int, Dict[str, Any]]:
+    # Imported once the environment points to the endpoint
+    from services.contract_service import ContractService
+
+    service = ContractService()
+    semaphore = asyncio.Semaphore(concurrency)
+    extracted:Dict[str, Dict[str, Any]] = {}
+    errors = 0
+
+    async def analyze(name:str):
+        nonlocal errors
+        async with semaphore:
+            try:
+                fields = await service.analyze_contract(name)
+                extracted[name] = fields.model_dump(by_alias=True)
+            except Exception:
+                errors += 1
+
+    try:
+        await asyncio.gather(*[analyze(name) for name in names])
+        return extracted, errors, service.stats()
+    finally:
+        await service.close()
+
+
+def extract_from_responses(names:List[str], directory:str) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    from services.contract_service import ContractService
+
+    extractor = ContractService.extractor
+    extracted:Dict[str, Dict[str, Any]] = {}
+    errors = 0
+    for name in names:
+        path = Path(directory) / f"{name}.json"
+        if not path.exists():
+            errors += 1
+            continue
+        with open(path, encoding="utf-8") as f:
+            result = json.load(f)
+        result = result.get("analyzeResult", result)
+        if not result.get("documents"):
+            errors += 1
+            continue
+        extracted[name] = extractor.extract(result["documents"][0]).model_dump(by_alias=True)
+    return extracted, errors
+
+
+async def main_async(args:argparse.Namespace):
+    ground_truth = {Path(record["filename"]).name: record for record in load_manifest(args.ground_truth, args.limit)}
+    expected = to_frame(ground_truth)
+    names = list(expected.index)
+
+    runner = None
+    service_stats = None
+    started_at = time.perf_counter()
+    try:
+        if args.responses:
+            extracted, errors = extract_from_responses(names, args.responses)
+        else:
+            endpoint = args.endpoint
+            if not endpoint:
+                config = config_from_arguments(args)
+                config.manifest = ground_truth
+                runner, endpoint = await start_server(config)
+                started_at = time.perf_counter()
+
+            os.environ["DOC_ENDPOINT"] = endpoint
+            os.environ.setdefault("DOC_API_KEY", "benchmark")
+            os.environ.setdefault("BLOB_ACCOUNT_URL", "https://benchmark.blob.core.windows.net")
+            os.environ.setdefault("CONTAINER_NAME", "documents")
+            extracted, errors, service_stats = await extract_with_service(names, args.concurrency)
+        elapsed = time.perf_counter() - started_at
+    finally:
+        if runner:
+            await runner.cleanup()
+
+    compare_started_at = time.perf_counter()
+    report, matches = compare(expected, to_frame(extracted) if extracted else expected.iloc[0:0])
+    compare_elapsed = time.perf_counter() - compare_started_at
+
+    if args.details:
+        mismatches = matches[(matches == False).any(axis=1)]  # noqa: E712
+        mismatches.to_csv(args.details, index_label="document")
+
+    result = {
+        "source": "responses" if args.responses else "service",
+        "documents": len(names),
+        "extracted": len(extracted),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "docs_per_second": round(len(names) / elapsed, 2) if elapsed else None,
+        "compare_seconds": round(compare_elapsed, 3),
+        "fields": json.loads(report.round(4).to_json(orient="index")),
+    }
+    if service_stats is not None:
+        result["service"] = service_stats
+    print(json.dumps(result, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("ground_truth", help="Ground truth manifest (JSONL) of the data generator")
+    parser.add_argument("--responses", help="Directory of recorded analyze responses to extract instead of calling the service")
+    parser.add_argument("--limit", type=int, help="Only evaluate the first documents of the manifest")
+    parser.add_argument("--concurrency", type=int, default=16, help="Documents analyzed at the same time")
+    parser.add_argument("--details", help="Write the documents with a mismatched field to this CSV file")
+    parser.add_argument("--endpoint", help="Use this Document Intelligence endpoint instead of starting the fake one")
+    add_arguments(parser)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""Local stand-in for the Document Intelligence prebuilt-contract model.
+
+Implements the analyze / get analyze result operations used by
+``ContractService`` with a configurable latency, jitter, throttling (429) and
+page count. The analyzed documents are built from the metadata of the data
+generator (``src/dataGenerator/contract_data.py``), or read from a ground truth
+manifest, so the extracted fields are realistic.
+
+Run from ``src/functions``::
+
+    python -m benchmarks.fake_doc_intelligence --port 5050 --latency 2 --throttle-rate 0.05
+
+then point ``DOC_ENDPOINT`` to ``http://localhost:5050`` (any ``DOC_API_KEY``).
+"""
+from aiohttp import web
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote, urlparse
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import sys
+import time
+import uuid
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "dataGenerator"))
+from contract_data import build_contract_metadata, generate_contract  # noqa: E402
+
+API_VERSION = "2024-11-30"
+CONTRACT_INDEX = re.compile(r"contract_(\d+)_")
+
+
+class FakeConfig:
+    def __init__(self,
+                 latency:float=1.0,
+                 jitter:float=0.2,
+                 latency_per_page:float=0.1,
+                 throttle_rate:float=0.0,
+                 capacity:int=0,
+                 retry_after:int=1,
+                 pages:int=1,
+                 manifest:Optional[str]=None,
+                 clause_repeat:int=1,
+                 seed:int=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.latency_per_page = latency_per_page
+        self.throttle_rate = throttle_rate
+        self.capacity = capacity
+        self.retry_after = retry_after
+        self.pages = pages
+        self.clause_repeat = clause_repeat
+        self.seed = seed
+        self.manifest:Dict[str, Dict[str, Any]] = {}
+        if manifest:
+            with open(manifest, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.manifest[Path(record["filename"]).name] = record
+
+
+def _iso(timestamp:float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _string(value:str, confidence:float=0.95) -> Dict[str, Any]:
+    return {"type": "string", "valueString": value, "content": value, "confidence": confidence}
+
+
+def _date(value:str, text_format:str) -> Dict[str, Any]:
+    content = datetime.strptime(value, "%Y-%m-%d").strftime(text_format)
+    return {"type": "date", "valueDate": value, "content": content, "confidence": 0.93}
+
+
+def _object(values:Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {"type": "object", "valueObject": values, "confidence": 0.9}
+
+
+def _parse_pages(pages:Optional[str], page_count:int) -> List[int]:
+    if not pages:
+        return list(range(1, page_count + 1))
+
+    selected = set()
+    for part in pages.split(","):
+        start, _, end = part.partition("-")
+        for page in range(int(start), int(end or start) + 1):
+            if 1 <= page <= page_count:
+                selected.add(page)
+    return sorted(selected)
+
+
+class FakeDocumentIntelligence:
+    def __init__(self, config:FakeConfig):
+        self.config = config
+        self.operations:Dict[str, Dict[str, Any]] = {}
+        self.running = 0
+        self.analyze_requests = 0
+        self.throttled = 0
+        self.polls = 0
+        self._random = random.Random(config.seed)
+
+    def metadata(self, name:str) -> Dict[str, Any]:
+        if name in self.config.manifest:
+            return self.config.manifest[name]
+
+        # Same blob name, same contract
+        rng = random.Random(f"{self.config.seed}:{name}")
+        match = CONTRACT_INDEX.search(name)
+        index = int(match.group(1)) - 1 if match else rng.randrange(1000)
+        return build_contract_metadata(**generate_contract(index, "", rng))
+
+    def analyzed_document(self, metadata:Dict[str, Any], pages:List[int]) -> Dict[str, Any]:
+        if not pages:
+            return {"docType": "contract", "fields": {}, "confidence": 0.9}
+
+        parties = [
+            _object({
+                "Name": _string(party["name"]),
+                "Address": _string(party["address"]),
+                "ReferenceName": _string(party["referenceName"]),
+                "Clause": _string(" ".join([party["clause"]] * self.config.clause_repeat)),
+            })
+            for party in metadata["parties"]
+        ]
+        jurisdictions = [
+            _object({
+                "Region": _string(region),
+                "Clause": _string(f"This Agreement shall be governed by and construed in accordance with the internal laws of the State of {region}."),
+            })
+            for region in metadata["jurisdictions"]
+        ]
+        fields = {
+            "Parties": {"type": "array", "valueArray": parties},
+            "Jurisdictions": {"type": "array", "valueArray": jurisdictions},
+        }
+
+        # The header and the dates are on the first page
+        if pages[0] == 1:
+            fields.update({
+                "Title": _string(metadata["title"]),
+                "ContractId": _string(metadata["contractId"]),
+                "ExecutionDate": _date(metadata["executionDate"], "%B %d, %Y"),
+                "EffectiveDate": _date(metadata["effectiveDate"], "%d day of %B, %Y"),
+                "ExpirationDate": _date(metadata["expirationDate"], "%B %d, %Y"),
+                "RenewalDate": _date(metadata["renewalDate"], "%B %d, %Y"),
+                "ContractDuration": _string(metadata["contractDuration"]),
+            })
+
+        return {"docType": "contract", "fields": fields, "confidence": 0.97}
+
+    def analyze_result(self, model_id:str, metadata:Dict[str, Any], pages:List[int]) -> Dict[str, Any]:
+        return {
+            "apiVersion": API_VERSION,
+            "modelId": model_id,
+            "stringIndexType": "textElements",
+            "content": f"{metadata['title']}\nContract ID: {metadata['contractId']}",
+            "pages": [
+                {"pageNumber": page, "angle": 0, "width": 8.5, "height": 11, "unit": "inch", "spans": []}
+                for page in pages
+            ],
+            "documents": [self.analyzed_document(metadata, pages)],
+        }
+
+    async def read_document_name(self, request:web.Request) -> str:
+        body = await request.read()
+        if request.content_type == "application/json":
+            payload = json.loads(body or b"{}")
+            if payload.get("urlSource"):
+                return unquote(Path(urlparse(payload["urlSource"]).path).name)
+            body = base64.b64decode(payload.get("base64Source") or "")
+        return hashlib.sha1(body).hexdigest()
+
+    async def analyze(self, request:web.Request) -> web.Response:
+        self.analyze_requests += 1
+        model_id = request.match_info["model"].split(":")[0]
+
+        config = self.config
+        if (config.capacity and self.running >= config.capacity) or self._random.random() < config.throttle_rate:
+            self.throttled += 1
+            return web.json_response(
+                {"error": {"code": "429", "message": "Rate limit is exceeded."}},
+                status=429,
+                headers={"Retry-After": str(config.retry_after)}
+            )
+
+        name = await self.read_document_name(request)
+        metadata = self.metadata(name)
+        page_count = metadata.get("pageCount", config.pages)
+        pages = _parse_pages(request.query.get("pages"), page_count)
+
+        latency = config.latency + config.latency_per_page * len(pages)
+        latency = max(0.0, latency + self._random.uniform(-config.jitter, config.jitter))
+
+        operation_id = str(uuid.uuid4())
+        now = time.time()
+        self.operations[operation_id] = {
+            "created": now,
+            "ready_at": now + latency,
+            "result": self.analyze_result(model_id, metadata, pages),
+        }
+        self.running += 1
+
+        location = f"{request.scheme}://{request.host}/documentintelligence/documentModels/{model_id}/analyzeResults/{operation_id}?api-version={API_VERSION}"
+        return web.Response(status=202, headers={"Operation-Location": location})
+
+    async def get_result(self, request:web.Request) -> web.Response:
+        self.polls += 1
+        operation = self.operations.get(request.match_info["result_id"])
+        if operation is None:
+            return web.json_response({"error": {"code": "NotFound", "message": "Operation not found."}}, status=404)
+
+        now = time.time()
+        status = {"createdDateTime": _iso(operation["created"])}
+        if now < operation["ready_at"]:
+            status.update({"status": "running", "lastUpdatedDateTime": _iso(now)})
+            return web.json_response(status)
+
+        if "finished" not in operation:
+            operation["finished"] = True
+            self.running -= 1
+
+        status.update({
+            "status": "succeeded",
+            "lastUpdatedDateTime": _iso(operation["ready_at"]),
+            "analyzeResult": operation["result"],
+        })
+        return web.json_response(status)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "analyze_requests": self.analyze_requests,
+            "throttled": self.throttled,
+            "polls": self.polls,
+            "running": self.running,
+        }
+
+
+def create_app(config:FakeConfig) -> web.Application:
+    service = FakeDocumentIntelligence(config)
+    app = web.Application(client_max_size=512 * 1024 * 1024)
+    app["service"] = service
+    app.router.add_post("/documentintelligence/documentModels/{model}", service.analyze)
+    app.router.add_get("/documentintelligence/documentModels/{model}/analyzeResults/{result_id}", service.get_result)
+    return app
+
+
+async def start_server(config:FakeConfig, host:str="127.0.0.1", port:int=0):
+    """Start the server on the running loop, returns the runner and the endpoint"""
+    runner = web.AppRunner(create_app(config), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
+
+
+def add_arguments(parser:argparse.ArgumentParser):
+    parser.add_argument("--latency", type=float, default=1.0, help="Base analysis latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Uniform jitter added to the latency in seconds")
+    parser.add_argument("--latency-per-page", type=float, default=0.1, help="Latency added for each page")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability that an analyze request gets a 429")
+    parser.add_argument("--capacity", type=int, default=0, help="Operations running at the same time before answering 429 (0 for no limit)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After of the 429 answers in seconds")
+    parser.add_argument("--pages", type=int, default=1, help="Page count of the documents")
+    parser.add_argument("--manifest", help="Ground truth manifest (JSONL) of the data generator")
+    parser.add_argument("--clause-repeat", type=int, default=1, help="Times the clause of each party is repeated (larger responses)")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from_arguments(args:argparse.Namespace) -> FakeConfig:
+    return FakeConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        latency_per_page=args.latency_per_page,
+        throttle_rate=args.throttle_rate,
+        capacity=args.capacity,
+        retry_after=args.retry_after,
+        pages=args.pages,
+        manifest=args.manifest,
+        clause_repeat=args.clause_repeat,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5050)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    web.run_app(create_app(config_from_arguments(args)), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,280 @@
+import time
+
+# Load time of the module, reported as the startup_import stage
+_import_started_at = time.perf_counter()
+
 from azure.functions import HttpMethod
-from request import DocumentRequest, DocumentOutput
+from request import DocumentOutput, DocumentInformation, OutputWriter, parse_document_request, serialize_output
 from pydantic import ValidationError
-from services.contract_service import ContractService
+from services.telemetry import configure_telemetry, telemetry
+from services.preflight import PreflightRejected
 from models import ContractFields, Contract, Message
+from typing import TYPE_CHECKING, Awaitable, Dict, List, Optional, Set
+from collections import Counter
 import azure.functions as func
+import importlib
+import threading
+import asyncio
 import logging
 import json
+import os
+
+if TYPE_CHECKING:
+    from services.contract_service import ContractService
+
+# Before the first span, see services/telemetry.py
+configure_telemetry()
 
 app = func.FunctionApp(http_auth_level=func.AuthLevel.FUNCTION)
 
-contract_service = ContractService()
+# The Azure SDKs are most of the load time of the app, on every scale-out:
+# eager: the service and its modules are loaded with the app
+# lazy: they are loaded by the first request
+# preload: they are imported by a background thread while the host starts,
+# the clients are created by the first request
+startup_mode = os.getenv('STARTUP_MODE', 'preload').lower()
+_contract_service:Optional["ContractService"] = None
+_first_request_served = False
 
-@app.route(route="process", methods=[HttpMethod.POST])
-async def process_contract(req: func.HttpRequest) -> func.HttpResponse:
-    logging.info('Python HTTP trigger function processed a request.')
+def get_contract_service() -> "ContractService":
+    global _contract_service
+    if _contract_service is None:
+        started_at = time.perf_counter()
+        from services.contract_service import ContractService
+        _contract_service = ContractService()
+        telemetry.record("service_init", time.perf_counter() - started_at)
+        logging.info(f"Contract service created in {time.perf_counter() - started_at:.3f}s ({startup_mode} startup)")
+    return _contract_service
+
+if startup_mode == 'eager':
+    get_contract_service()
+elif startup_mode == 'preload':
+    threading.Thread(target=importlib.import_module, args=("services.contract_service",), daemon=True).start()
+elif startup_mode != 'lazy':
+    raise ValueError(f"Unknown STARTUP_MODE value: {startup_mode}")
+
+# sync: the skill analyzes the contracts before answering
+# async: the skill answers with the results already stored and queues the
+# other contracts, analyzed by process_contract_queue
+skill_mode = os.getenv('SKILL_MODE', 'sync').lower()
+analysis_queue_name = "contract-analysis"
+
+if skill_mode == 'async':
+    # memory and sqlite are not shared by the instances
+    if os.getenv('RESULT_CACHE', 'none').lower() != 'blob':
+        raise ValueError("SKILL_MODE async requires a result cache shared by the instances (RESULT_CACHE=blob)")
+    if os.getenv('INDEX_TARGET', 'search').lower() == 'search' and not os.getenv('SEARCH_ENDPOINT'):
+        raise ValueError("SKILL_MODE async requires the index the analyzed fields are merged into (SEARCH_ENDPOINT)")
+
+# Maximum number of records analyzed at the same time by this instance,
+# shared across all the requests the worker is serving
+max_concurrent_records = int(os.getenv('MAX_CONCURRENT_RECORDS', '10'))
+record_semaphore = asyncio.Semaphore(max_concurrent_records)
+
+# Records of a skill batch in flight at the same time (0 for all of them) and
+# size limit of the response (0 for no limit), they bound the memory used by
+# a large batch. Each record is serialized once processed, only its JSON is
+# kept until the response is sent.
+max_batch_in_flight = int(os.getenv('MAX_BATCH_IN_FLIGHT', '0'))
+max_response_bytes = int(os.getenv('MAX_RESPONSE_BYTES', '0'))
+
+# The size of the response is only known once the records are analyzed, with
+# all of them started at once none would be skipped
+if max_response_bytes and not max_batch_in_flight:
+    raise ValueError("MAX_RESPONSE_BYTES requires a bounded MAX_BATCH_IN_FLIGHT")
+
+async def _analyze(file_name:str) -> ContractFields:
+
+    return await get_contract_service().analyze_contract(file_name=file_name, semaphore=record_semaphore)
+
+async def _process_record(doc:DocumentInformation, analysis:Awaitable[ContractFields]) -> Contract:
+
+    try:
+        contract_fields:ContractFields = await analysis
+
+        return Contract(
+            recordId=doc.recordId,
+            data=contract_fields
+        )
+    except PreflightRejected as ex:
+        return _rejected_record(doc, ex)
+    except Exception as ex:
+        # Keeping the document in errors
+        return Contract(
+            recordId=doc.recordId,
+            data=ContractFields(),
+            errors=Message(
+                message=str(ex)
+            )
+        )
+
+# A blob skipped by the pre-flight checks: indexed without the fields and a
+# warning, or kept in errors with DOC_PREFLIGHT_ACTION=error
+def _rejected_record(doc:DocumentInformation, ex:PreflightRejected) -> Contract:
+
+    message = Message(message=str(ex))
+    if ex.warning:
+        return Contract(recordId=doc.recordId, data=ContractFields(), warnings=message)
+    return Contract(recordId=doc.recordId, data=ContractFields(), errors=message)
+
+async def _lookup_record(doc:DocumentInformation, pending:List[str]) -> Contract:
+
+    file_name = doc.blob_metadata_data.metadata_storage_name
+    try:
+        # Not queued when it would not be analyzed
+        contract_fields = await get_contract_service().get_cached_contract(file_name, preflight=True)
+    except PreflightRejected as ex:
+        return _rejected_record(doc, ex)
+    except Exception as ex:
+        return Contract(
+            recordId=doc.recordId,
+            data=ContractFields(),
+            errors=Message(
+                message=str(ex)
+            )
+        )
+
+    if contract_fields:
+        return Contract(
+            recordId=doc.recordId,
+            data=contract_fields
+        )
+
+    pending.append(file_name)
+    return Contract(
+        recordId=doc.recordId,
+        data=ContractFields(),
+        warnings=Message(
+            message=f"{file_name} has been queued for analysis, the fields will be available on the next run"
+        )
+    )
+
+async def _analyze_batch(values:List[DocumentInformation], output:OutputWriter):
+
+    # Records of the batch pointing at the same blob share one analysis (and
+    # one slot of record_semaphore), released with the last of its records
+    analyses:Dict[str, asyncio.Task] = {}
+    remaining = Counter(doc.blob_metadata_data.metadata_storage_name for doc in values)
 
+    async def write_record(index:int, doc:DocumentInformation):
+        file_name = doc.blob_metadata_data.metadata_storage_name
+        if output.full:
+            # Not analyzed, its fields could not be sent. The records already
+            # in flight are analyzed and dropped by write when over the limit.
+            output.skip(index, doc.recordId)
+        else:
+            analysis = analyses.get(file_name)
+            if analysis is None:
+                analysis = analyses[file_name] = asyncio.ensure_future(_analyze(file_name))
+            output.write(index, await _process_record(doc, analysis))
+
+        remaining[file_name] -= 1
+        if remaining[file_name] == 0:
+            analyses.pop(file_name, None)
+
+    in_flight:Set[asyncio.Task] = set()
+    for index, doc in enumerate(values):
+        if max_batch_in_flight and len(in_flight) >= max_batch_in_flight:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        in_flight.add(asyncio.ensure_future(write_record(index, doc)))
+
+    await asyncio.gather(*in_flight)
+
+def _record_request(started_at:float, records:int):
+    global _first_request_served
+    elapsed = time.perf_counter() - started_at
+    telemetry.record("request", elapsed)
+    if not _first_request_served:
+        _first_request_served = True
+        telemetry.record("first_request", elapsed)
+        logging.info(f"First request served in {elapsed:.3f}s")
+
+    logging.info(f"Processed {records} records in {elapsed:.3f}s")
+    logging.info(f"Contract service: {get_contract_service().stats()}")
+
+@app.route(route="process", methods=[HttpMethod.POST])
+@app.queue_output(arg_name="queue", queue_name=analysis_queue_name, connection="AzureWebJobsStorage")
+async def process_contract(req: func.HttpRequest, queue: func.Out[List[str]]) -> func.HttpResponse:
+    started_at = time.perf_counter()
 
     try:
-        req_body = req.get_json()
-        document_request = DocumentRequest(**req_body)
-        document_output = DocumentOutput(values=[])
-
-        for doc in document_request.values:
-
-            try:
-                contract_fields:ContractFields = await contract_service.analyze_contract(file_name=doc.blob_metadata_data.metadata_storage_name)
-                
-                contract = Contract(
-                    recordId=doc.recordId,
-                    data=contract_fields
-                )
-                
-                document_output.values.append(contract)
-            except Exception as ex:
-                # Keeping the document in errors
-                contract = Contract(
-                    recordId=doc.recordId,
-                    data=ContractFields(),
-                    errors=Message(
-                        message=str(ex)
-                    )
-                )
-                document_output.values.append(contract)
-
-
-            
-        return func.HttpResponse(document_output.model_dump_json(indent=4, by_alias=True),
+        with telemetry.stage("parse"):
+            document_request = parse_document_request(req.get_body())
+
+        records = len(document_request.values)
+
+        # gather keeps the results in the same order than the records received
+        if skill_mode == 'async':
+            pending:List[str] = []
+            contracts = await asyncio.gather(*[_lookup_record(doc, pending) for doc in document_request.values])
+            if pending:
+                queue.set([json.dumps({"file_name": file_name}) for file_name in pending])
+
+            with telemetry.stage("serialize", records=records):
+                body = serialize_output(DocumentOutput(values=contracts))
+        else:
+            output = OutputWriter(records, max_bytes=max_response_bytes)
+            await _analyze_batch(document_request.values, output)
+            if output.truncated:
+                logging.warning(f"{output.truncated} records over the {max_response_bytes} bytes of the response")
+
+            with telemetry.stage("serialize", records=records):
+                body = output.body()
+
+        _record_request(started_at, records)
+
+        return func.HttpResponse(body,
                                  mimetype="application/json",
                                  status_code=200)
 
+    # ValidationError is a ValueError, it must be handled first
+    except ValidationError as e:
+        return func.HttpResponse(f"Invalid request format: {str(e)}", status_code=400)
     except ValueError as ex:
         logging.error(ex)
         return func.HttpResponse("The payload body is null", status_code=400)
-    except ValidationError as e:
-        return func.HttpResponse(f"Invalid request format: {str(e)}", status_code=400)
\ No newline at end of file
+
+@app.queue_trigger(arg_name="msg", queue_name=analysis_queue_name, connection="AzureWebJobsStorage")
+async def process_contract_queue(msg: func.QueueMessage):
+
+    file_name = msg.get_json()["file_name"]
+
+    # The result is stored by the result cache of the service, a failure is
+    # retried by the queue until the message goes to the poison queue. The
+    # analysis is not bound by the timeout of the skill.
+    try:
+        contract_fields = await get_contract_service().analyze_contract(file_name=file_name, semaphore=record_semaphore, background=True)
+    except PreflightRejected as ex:
+        # Modified since it was queued, not retried
+        logging.warning(f"{file_name} not analyzed from the queue: {ex}")
+        return
+
+    # The indexer does not run the skill again for an unmodified blob, the
+    # fields are merged into the document it indexed without them. A failure
+    # is retried by the queue, the analysis is then read from the cache.
+    from services.index_writer import create_index_writer
+    from services.push_indexer import contract_key, index_document
+
+    key = contract_key(get_contract_service(), file_name)
+    writer = create_index_writer(get_contract_service().clients)
+    await writer.add(index_document(key, contract_fields))
+    await writer.close()
+    if key in writer.failed:
+        raise RuntimeError(f"The fields of {file_name} could not be merged into the index: {writer.failed[key]}")
+
+    logging.info(f"{file_name} analyzed from the queue and merged into the index")
+
+# Push mode: the contracts of the container are analyzed and pushed to the
+# index on a schedule (NCRONTAB), see services/push_indexer.py
+if os.getenv('PUSH_INDEX_SCHEDULE'):
+
+    @app.timer_trigger(schedule="%PUSH_INDEX_SCHEDULE%", arg_name="timer")
+    async def push_contracts_timer(timer: func.TimerRequest):
+        from services.push_indexer import push_contracts
+
+        stats = await push_contracts(contract_service=get_contract_service())
+        logging.info(f"Push indexing: {stats}")
+
+telemetry.record("startup_import", time.perf_counter() - _import_started_at)
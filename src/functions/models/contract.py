@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from datetime import datetime
+from typing import Dict, Optional, List
+import json
 
 class Jurisdiction(BaseModel):
     region:Optional[str] = None
@@ -11,18 +13,37 @@ class Party(BaseModel):
     reference_name: Optional[str] = Field(default=None, alias="referenceName")
     clause: Optional[str] = None
 
-# Extracted from Document Intelligence
+# Extracted from Document Intelligence, each field is read from the field with
+# the PascalCase name of its alias (see services/field_extractor.py). Fields
+# not returned by prebuilt-contract are requested as query fields. The dates
+# and the duration are also returned normalized (the *Value and *Months
+# fields), filterable and sortable in the index.
 class ContractFields(BaseModel):
-    doc_type:Optional[str] = Field(default=None,alias="docType")
+    doc_type:Optional[str] = Field(default=None,alias="docType", json_schema_extra={"di_field": "docType"})
     title:Optional[str] = None
     contract_id: Optional[str] = Field(default=None, alias="contractId")
-    parties:List[Party] = []
+    # Parties of the page ranges of a split contract are merged by name
+    parties:List[Party] = Field(default=[], json_schema_extra={"di_merge_key": "name"})
     execution_date: Optional[str] = Field(default=None, alias="executionDate")
     effective_date:Optional[str] = Field(default=None,alias="effectiveDate")
     expiration_date: Optional[str] = Field(default=None, alias="expirationDate")
     contract_duration: Optional[str] = Field(default=None, alias="contractDuration")
     renewal_date: Optional[str] = Field(default=None, alias="renewalDate")
-    jurisdictions:List[str] = []
+    execution_date_value: Optional[datetime] = Field(default=None, alias="executionDateValue", json_schema_extra={"di_field": "ExecutionDate"})
+    effective_date_value: Optional[datetime] = Field(default=None, alias="effectiveDateValue", json_schema_extra={"di_field": "EffectiveDate"})
+    expiration_date_value: Optional[datetime] = Field(default=None, alias="expirationDateValue", json_schema_extra={"di_field": "ExpirationDate"})
+    renewal_date_value: Optional[datetime] = Field(default=None, alias="renewalDateValue", json_schema_extra={"di_field": "RenewalDate"})
+    contract_duration_months: Optional[float] = Field(default=None, alias="contractDurationMonths", json_schema_extra={"di_field": "ContractDuration", "di_format": "months"})
+    jurisdictions:List[str] = Field(default=[], json_schema_extra={"di_item_field": "Region"})
+    # Confidence of each extracted field, not returned to the indexer
+    confidence:Dict[str, float] = Field(default_factory=dict, exclude=True)
+
+    def stored_json(self) -> str:
+        # With the confidence, for the result cache and the re-extraction: a
+        # stored result is the same as a fresh one
+        values = self.model_dump(mode='json', by_alias=True)
+        values["confidence"] = self.confidence
+        return json.dumps(values, separators=(',', ':'))
 
 class Message(BaseModel):
     message:str
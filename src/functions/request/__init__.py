@@ -1,2 +1,3 @@
-from .document_request import DocumentRequest
-from .document_output import DocumentOutput
\ No newline at end of file
+from .document_request import DocumentRequest, DocumentInformation
+from .document_output import DocumentOutput
+from .serialization import OutputWriter, parse_document_request, serialize_contract, serialize_output
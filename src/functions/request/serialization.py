@@ -0,0 +1,103 @@
+from pydantic import TypeAdapter
+from typing import List, Optional
+from models import Contract, ContractFields, Message
+from .document_request import DocumentRequest
+from .document_output import DocumentOutput
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Built once, validating or serializing through them skips the per call
+# setup of model_dump_json / DocumentRequest(**body)
+document_request_adapter = TypeAdapter(DocumentRequest)
+document_output_adapter = TypeAdapter(DocumentOutput)
+contract_adapter = TypeAdapter(Contract)
+
+RESPONSE_FORMATS = ("compact", "orjson", "pretty")
+
+def get_response_format(response_format:Optional[str]=None) -> str:
+    response_format = (response_format or os.getenv('RESPONSE_FORMAT', 'compact')).lower()
+    if response_format not in RESPONSE_FORMATS:
+        raise ValueError(f"Unknown RESPONSE_FORMAT value: {response_format}")
+    if response_format == 'orjson' and orjson is None:
+        raise ValueError("RESPONSE_FORMAT is orjson but the orjson package is not installed")
+    return response_format
+
+# Checked at import, a misconfigured app fails at startup rather than
+# answering in another format
+RESPONSE_FORMAT = get_response_format()
+
+def parse_document_request(body:bytes) -> DocumentRequest:
+    if not body:
+        raise ValueError("The payload body is null")
+
+    # Parses and validates the raw body in one pass
+    return document_request_adapter.validate_json(body)
+
+def serialize_output(document_output:DocumentOutput, response_format:Optional[str]=None) -> bytes:
+    response_format = get_response_format(response_format) if response_format else RESPONSE_FORMAT
+
+    if response_format == 'orjson':
+        return orjson.dumps(document_output_adapter.dump_python(document_output, mode='json', by_alias=True))
+
+    if response_format == 'pretty':
+        return document_output_adapter.dump_json(document_output, indent=4, by_alias=True)
+
+    return document_output_adapter.dump_json(document_output, by_alias=True)
+
+def serialize_contract(contract:Contract, response_format:Optional[str]=None) -> bytes:
+    response_format = get_response_format(response_format) if response_format else RESPONSE_FORMAT
+
+    if response_format == 'orjson':
+        return orjson.dumps(contract_adapter.dump_python(contract, mode='json', by_alias=True))
+
+    if response_format == 'pretty':
+        return contract_adapter.dump_json(contract, indent=4, by_alias=True)
+
+    return contract_adapter.dump_json(contract, by_alias=True)
+
+# Builds the skill response one record at a time: each record is serialized
+# as soon as it is processed and only its JSON is kept, in the order of the
+# request. Past max_bytes (0 for no limit) the records are answered with an
+# error instead of their fields.
+class OutputWriter:
+
+    def __init__(self, records:int, max_bytes:int=0, response_format:Optional[str]=None):
+        self.max_bytes = max_bytes
+        self.response_format = response_format
+        self.size = 0
+        self.truncated = 0
+        self._parts:List[Optional[bytes]] = [None] * records
+
+    @property
+    def full(self) -> bool:
+        return self.max_bytes > 0 and self.size >= self.max_bytes
+
+    def write(self, index:int, contract:Contract):
+        part = serialize_contract(contract, self.response_format)
+        if self.max_bytes > 0 and self.size + len(part) > self.max_bytes:
+            part = self._size_exceeded(contract.record_id)
+        self._store(index, part)
+
+    def skip(self, index:int, record_id:str):
+        # A record not processed once the response is full
+        self._store(index, self._size_exceeded(record_id))
+
+    def _store(self, index:int, part:bytes):
+        self._parts[index] = part
+        self.size += len(part) + 1
+
+    def _size_exceeded(self, record_id:str) -> bytes:
+        # Small, so the response stays around max_bytes
+        self.truncated += 1
+        return serialize_contract(Contract(
+            recordId=record_id,
+            data=ContractFields(),
+            errors=Message(message=f"The response of the skill is limited to {self.max_bytes} bytes, reduce the batchSize of the skillset")
+        ), self.response_format)
+
+    def body(self) -> bytes:
+        return b'{"values":[' + b','.join(self._parts) + b']}'
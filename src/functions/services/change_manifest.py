@@ -0,0 +1,244 @@
+from azure.core.exceptions import ResourceNotFoundError
+from services.client_factory import ClientFactory
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import os
+
+# Largest block appended to an append blob
+MAX_APPEND_BYTES = 4 * 1024 * 1024
+
+# ETag of every contract pushed to the index, so a push run only analyzes the
+# new or modified blobs and removes from the index the blobs deleted since. An
+# entry is committed once its document is indexed. Every checkpoint_interval
+# changes, the changes since the previous checkpoint are appended to a log
+# (one JSON line per change) rather than the whole manifest written again: an
+# interrupted backfill resumes where its last checkpoint stopped. The log is
+# compacted into the snapshot by load once it outgrows it.
+class ChangeManifest(ABC):
+
+    def __init__(self, checkpoint_interval:int=500):
+        self.checkpoint_interval = checkpoint_interval
+        self.entries:Dict[str, str] = {}
+        self.new = 0
+        self.modified = 0
+        self.unchanged = 0
+        self.checkpoints = 0
+        self.compactions = 0
+        # ETag by name of the changes since the last checkpoint, None when removed
+        self._changes:Dict[str, Optional[str]] = {}
+        # Changes in the log, replayed over the snapshot by load
+        self._log_size = 0
+        self._lock = asyncio.Lock()
+
+    def is_changed(self, name:str, etag:str) -> bool:
+        current = self.entries.get(name)
+        if current is None:
+            self.new += 1
+            return True
+
+        if current != etag:
+            self.modified += 1
+            return True
+
+        self.unchanged += 1
+        return False
+
+    def commit(self, name:str, etag:str):
+        self.entries[name] = etag
+        self._changes[name] = etag
+
+    def remove(self, name:str):
+        if self.entries.pop(name, None) is not None:
+            self._changes[name] = None
+
+    async def checkpoint(self, force:bool=False):
+        async with self._lock:
+            if not self._changes or (not force and len(self._changes) < self.checkpoint_interval):
+                return
+            changes = self._changes
+            self._changes = {}
+            try:
+                await self._append_log([
+                    json.dumps(["set", name, etag] if etag is not None else ["remove", name], separators=(',', ':'))
+                    for name, etag in changes.items()
+                ])
+            except BaseException:
+                # Written by the next checkpoint, the later changes win
+                self._changes = {**changes, **self._changes}
+                raise
+            self._log_size += len(changes)
+            self.checkpoints += 1
+
+    async def load(self):
+        snapshot = await self._read()
+        self.entries = json.loads(snapshot)["entries"] if snapshot is not None else {}
+
+        self._log_size = 0
+        for line in (await self._read_log() or "").splitlines():
+            try:
+                change = json.loads(line)
+            except ValueError:
+                # The last line of an interrupted append
+                continue
+            if change[0] == "set":
+                self.entries[change[1]] = change[2]
+            else:
+                self.entries.pop(change[1], None)
+            self._log_size += 1
+
+        # Replaying the log again over the new snapshot gives the same entries,
+        # an interruption between the two writes loses nothing
+        if self._log_size > max(len(self.entries), self.checkpoint_interval):
+            await self._write(json.dumps({"entries": self.entries}, separators=(',', ':')))
+            await self._reset_log()
+            self._log_size = 0
+            self.compactions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self.entries),
+            "new": self.new,
+            "modified": self.modified,
+            "unchanged": self.unchanged,
+            "checkpoints": self.checkpoints,
+            "compactions": self.compactions,
+            "log_size": self._log_size
+        }
+
+    @abstractmethod
+    async def _read(self) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def _write(self, value:str):
+        ...
+
+    @abstractmethod
+    async def _read_log(self) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def _append_log(self, lines:List[str]):
+        ...
+
+    @abstractmethod
+    async def _reset_log(self):
+        ...
+
+class FileChangeManifest(ChangeManifest):
+    def __init__(self, path:str, checkpoint_interval:int=500):
+        super().__init__(checkpoint_interval)
+        self.path = path
+        self.log_path = f"{path}.log"
+
+    @staticmethod
+    def _read_file(path:str) -> Optional[str]:
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as file:
+            return file.read()
+
+    def _write_file(self, value:str):
+        # Replaced in one step, an interruption keeps the previous snapshot
+        with open(f"{self.path}.tmp", 'w', encoding='utf-8') as file:
+            file.write(value)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def _append_file(self, lines:List[str]):
+        with open(self.log_path, 'a', encoding='utf-8') as file:
+            file.write("".join(f"{line}\n" for line in lines))
+
+    def _remove_log_file(self):
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+    async def _read(self) -> Optional[str]:
+        return await asyncio.to_thread(self._read_file, self.path)
+
+    async def _write(self, value:str):
+        await asyncio.to_thread(self._write_file, value)
+
+    async def _read_log(self) -> Optional[str]:
+        return await asyncio.to_thread(self._read_file, self.log_path)
+
+    async def _append_log(self, lines:List[str]):
+        await asyncio.to_thread(self._append_file, lines)
+
+    async def _reset_log(self):
+        await asyncio.to_thread(self._remove_log_file)
+
+# Shared by every instance of the function app running the push indexing, the
+# log is an append blob
+class BlobChangeManifest(ChangeManifest):
+    def __init__(self, clients:ClientFactory, container_name:str, blob_name:str, checkpoint_interval:int=500):
+        super().__init__(checkpoint_interval)
+        self.clients = clients
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.log_blob_name = f"{blob_name}.log"
+
+    async def _download(self, blob_name:str) -> Optional[str]:
+        try:
+            downloader = await self.clients.get_container_client(self.container_name).download_blob(blob_name, encoding='utf-8')
+        except ResourceNotFoundError:
+            return None
+        return await downloader.readall()
+
+    async def _read(self) -> Optional[str]:
+        return await self._download(self.blob_name)
+
+    async def _write(self, value:str):
+        container_client = await self.clients.get_created_container_client(self.container_name)
+        await container_client.upload_blob(self.blob_name, value.encode('utf-8'), overwrite=True)
+
+    async def _read_log(self) -> Optional[str]:
+        return await self._download(self.log_blob_name)
+
+    async def _append_log(self, lines:List[str]):
+        container_client = await self.clients.get_created_container_client(self.container_name)
+        log_blob = container_client.get_blob_client(self.log_blob_name)
+
+        # Whole lines in blocks of at most MAX_APPEND_BYTES
+        blocks:List[bytes] = [b""]
+        for line in lines:
+            data = f"{line}\n".encode('utf-8')
+            if blocks[-1] and len(blocks[-1]) + len(data) > MAX_APPEND_BYTES:
+                blocks.append(b"")
+            blocks[-1] += data
+
+        for block in blocks:
+            try:
+                await log_blob.append_block(block)
+            except ResourceNotFoundError:
+                await log_blob.create_append_blob()
+                await log_blob.append_block(block)
+
+    async def _reset_log(self):
+        container_client = await self.clients.get_created_container_client(self.container_name)
+        # Replaced by an empty append blob
+        await container_client.get_blob_client(self.log_blob_name).create_append_blob()
+
+def create_change_manifest(clients:ClientFactory) -> Optional[ChangeManifest]:
+    manifest_type = os.getenv('PUSH_MANIFEST', 'blob').lower()
+    checkpoint_interval = int(os.getenv('PUSH_CHECKPOINT_INTERVAL', '500'))
+
+    if manifest_type == 'blob':
+        return BlobChangeManifest(
+            clients=clients,
+            container_name=os.getenv('PUSH_MANIFEST_CONTAINER', 'results'),
+            blob_name=os.getenv('PUSH_MANIFEST_BLOB', 'push-manifest.json'),
+            checkpoint_interval=checkpoint_interval
+        )
+
+    if manifest_type == 'file':
+        return FileChangeManifest(
+            path=os.getenv('PUSH_MANIFEST_PATH', 'push_manifest.json'),
+            checkpoint_interval=checkpoint_interval
+        )
+
+    if manifest_type != 'none':
+        raise ValueError(f"Unknown PUSH_MANIFEST value: {manifest_type}")
+
+    return None
@@ -0,0 +1,105 @@
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import time
+import os
+
+# Raised instead of calling Document Intelligence while the circuit is open.
+# The record can be retried later: the next indexer run, or the queue in the
+# async skill mode.
+class CircuitOpenError(Exception):
+    pass
+
+# Fails fast while Document Intelligence is unhealthy. After
+# `failure_threshold` consecutive failures (timeouts, connection errors, 5xx)
+# the circuit opens for `reset_timeout` seconds, then lets `half_open_calls`
+# operations through: a success closes it, a failure opens it again. Client
+# errors (an invalid document) and throttling, left to the rate limiter, are
+# not failures of the service. A trial ended any other way (client error,
+# throttling, cancellation) gives its slot back with end_trial.
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold:int=10, reset_timeout:float=30, half_open_calls:int=1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.state = "closed"
+        self.opened = 0
+        self.rejected = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        # Incremented by each half-open state, a late end_trial of a previous
+        # one is ignored
+        self._half_open_id = 0
+
+    def check(self) -> Optional[int]:
+        # Returns the trial to pass to end_trial in the half-open state
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(self._message())
+            self.state = "half_open"
+            self._trials = 0
+            self._half_open_id += 1
+
+        if self.state == "half_open":
+            if self._trials >= self.half_open_calls:
+                self.rejected += 1
+                raise CircuitOpenError(self._message())
+            self._trials += 1
+            return self._half_open_id
+
+        return None
+
+    def end_trial(self, trial:Optional[int]):
+        # Called once the operation is over whatever its outcome, a success or
+        # a failure of the service already closed or opened the circuit
+        if trial is not None and self.state == "half_open" and trial == self._half_open_id:
+            self._trials = max(0, self._trials - 1)
+
+    def on_success(self):
+        if self.state != "closed":
+            logging.info("Document Intelligence recovered, circuit closed")
+        self.state = "closed"
+        self._failures = 0
+
+    def on_failure(self, ex:BaseException):
+        if not is_service_failure(ex):
+            return
+
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+                logging.warning(f"Document Intelligence unhealthy after {self._failures} failures, circuit open for {self.reset_timeout}s")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    def _message(self) -> str:
+        retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+        return f"Document Intelligence is unavailable, the analysis is retried later (circuit open, next attempt in {retry_in:.0f}s)"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "consecutive_failures": self._failures
+        }
+
+def is_service_failure(ex:BaseException) -> bool:
+    if isinstance(ex, HttpResponseError):
+        return ex.status_code is None or ex.status_code >= 500
+    return isinstance(ex, (TimeoutError, asyncio.TimeoutError, ServiceRequestError, ServiceResponseError))
+
+def create_circuit_breaker() -> Optional[CircuitBreaker]:
+    failure_threshold = int(os.getenv('DOC_CIRCUIT_FAILURES', '10'))
+    if failure_threshold <= 0:
+        return None
+
+    return CircuitBreaker(
+        failure_threshold=failure_threshold,
+        reset_timeout=float(os.getenv('DOC_CIRCUIT_RESET', '30'))
+    )
@@ -0,0 +1,169 @@
+from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import ResourceExistsError
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.identity.aio import DefaultAzureCredential
+from azure.storage.blob.aio import BlobServiceClient, ContainerClient
+from azure.ai.documentintelligence.aio import DocumentIntelligenceClient
+from services.telemetry import Telemetry, TimedCredential
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+import aiohttp
+import os
+
+if TYPE_CHECKING:
+    from azure.search.documents.aio import SearchClient
+
+# Owns the Azure clients shared by every document processed by the worker. One
+# aiohttp session (and its connection pool) is used by the blob and Document
+# Intelligence clients, and one credential caches the tokens for all of them.
+class ClientFactory:
+
+    def __init__(self, doc_policies:Optional[List]=None, telemetry:Optional[Telemetry]=None):
+        # Extra per retry policies of the Document Intelligence client
+        self.doc_policies = doc_policies or []
+        # Times the token fetches when set
+        self.telemetry = telemetry
+        self.account_url = os.getenv('BLOB_ACCOUNT_URL')
+        # Takes precedence over the account url, used with Azurite
+        self.blob_connection_string = os.getenv('BLOB_CONNECTION_STRING')
+        self.doc_endpoint = os.getenv('DOC_ENDPOINT')
+        self.doc_api_key = os.getenv('DOC_API_KEY')
+        self.search_endpoint = os.getenv('SEARCH_ENDPOINT')
+        self.search_api_key = os.getenv('SEARCH_API_KEY')
+        self.pool_size = int(os.getenv('HTTP_POOL_SIZE', '100'))
+        self.pool_size_per_host = int(os.getenv('HTTP_POOL_SIZE_PER_HOST', '0'))
+        self.keepalive_timeout = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', '30'))
+        # Size of the first and next ranges of a blob download, the ranges
+        # after the first one are downloaded in parallel
+        self.download_chunk_size = int(os.getenv('BLOB_DOWNLOAD_CHUNK_SIZE', str(4 * 1024 * 1024)))
+
+        self._session:Optional[aiohttp.ClientSession] = None
+        self._credential = None
+        self._blob_service_client:Optional[BlobServiceClient] = None
+        self._container_clients:Dict[str, ContainerClient] = {}
+        # Containers created (or found) by get_created_container_client
+        self._created_containers:Set[str] = set()
+        self._doc_client:Optional[DocumentIntelligenceClient] = None
+        self._search_clients:Dict[str, "SearchClient"] = {}
+
+    def _transport(self) -> AioHttpTransport:
+        # The session must be created from a running event loop, so it is
+        # created by the first client that needs it
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+
+        # Each client gets its own transport wrapping the shared session, the
+        # session is closed by the factory and not by the clients
+        return AioHttpTransport(session=self._session, session_owner=False)
+
+    def get_credential(self):
+        if self._credential is None:
+            self._credential = DefaultAzureCredential()
+            if self.telemetry:
+                self._credential = TimedCredential(self._credential, self.telemetry)
+        return self._credential
+
+    def get_blob_service_client(self) -> BlobServiceClient:
+        if self._blob_service_client is None:
+            if self.blob_connection_string:
+                self._blob_service_client = BlobServiceClient.from_connection_string(
+                    self.blob_connection_string,
+                    transport=self._transport(),
+                    max_single_get_size=self.download_chunk_size,
+                    max_chunk_get_size=self.download_chunk_size
+                )
+            else:
+                self._blob_service_client = BlobServiceClient(
+                    account_url=self.account_url,
+                    credential=self.get_credential(),
+                    transport=self._transport(),
+                    max_single_get_size=self.download_chunk_size,
+                    max_chunk_get_size=self.download_chunk_size
+                )
+        return self._blob_service_client
+
+    def get_container_client(self, container_name:str) -> ContainerClient:
+        # Called on use by the stores (cache, archive, manifest), the clients
+        # can only be created from the event loop
+        container_client = self._container_clients.get(container_name)
+        if container_client is None:
+            container_client = self.get_blob_service_client().get_container_client(container_name)
+            self._container_clients[container_name] = container_client
+        return container_client
+
+    async def get_created_container_client(self, container_name:str) -> ContainerClient:
+        # Container written by the function (results, archive), created on
+        # its first write
+        container_client = self.get_container_client(container_name)
+        if container_name not in self._created_containers:
+            try:
+                await container_client.create_container()
+            except ResourceExistsError:
+                pass
+            self._created_containers.add(container_name)
+        return container_client
+
+    def get_document_intelligence_client(self) -> DocumentIntelligenceClient:
+        if self._doc_client is None:
+            if self.doc_api_key:
+                credential = AzureKeyCredential(self.doc_api_key)
+            else:
+                credential = self.get_credential()
+
+            self._doc_client = DocumentIntelligenceClient(
+                endpoint=self.doc_endpoint,
+                credential=credential,
+                transport=self._transport(),
+                per_retry_policies=self.doc_policies
+            )
+        return self._doc_client
+
+    def get_search_client(self, index_name:str) -> "SearchClient":
+        search_client = self._search_clients.get(index_name)
+        if search_client is None:
+            # Only used by the push indexer, not loaded by the skill
+            from azure.search.documents.aio import SearchClient
+
+            if self.search_api_key:
+                credential = AzureKeyCredential(self.search_api_key)
+            else:
+                credential = self.get_credential()
+
+            search_client = SearchClient(
+                endpoint=self.search_endpoint,
+                index_name=index_name,
+                credential=credential,
+                transport=self._transport()
+            )
+            self._search_clients[index_name] = search_client
+        return search_client
+
+    async def close(self):
+        for search_client in self._search_clients.values():
+            await search_client.close()
+        self._search_clients.clear()
+
+        if self._doc_client is not None:
+            await self._doc_client.close()
+            self._doc_client = None
+
+        for container_client in self._container_clients.values():
+            await container_client.close()
+        self._container_clients.clear()
+
+        if self._blob_service_client is not None:
+            await self._blob_service_client.close()
+            self._blob_service_client = None
+
+        if self._credential is not None:
+            await self._credential.close()
+            self._credential = None
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -1,131 +1,360 @@
-from azure.storage.blob.aio import BlobServiceClient, BlobClient, ContainerClient
-from azure.ai.documentintelligence.aio import DocumentIntelligenceClient
-from azure.ai.documentintelligence.models import AnalyzedDocument, AnalyzeDocumentRequest
-from azure.core.credentials import AzureKeyCredential
-from azure.identity.aio import DefaultAzureCredential
-from models import ContractFields, Jurisdiction, Party
-from typing import List
+from azure.ai.documentintelligence.models import AnalyzeResult, DocumentAnalysisFeature
+from azure.storage.blob import BlobProperties
+from azure.storage.blob.aio import BlobClient
+from services.client_factory import ClientFactory
+from services.result_cache import ResultCache, create_result_cache
+from services.rate_limiter import AdaptiveRateLimiter, ThrottlingFeedbackPolicy, create_rate_limiter
+from services.polling import PollingStrategy, PollingMetrics, create_polling_strategy
+from services.field_extractor import FieldExtractor, PREBUILT_CONTRACT_FIELDS
+from services.document_input import DocumentInput, create_document_input
+from services.page_splitter import PageSplitter, blob_page_count, count_pdf_pages, create_page_splitter, range_page_count
+from services.single_flight import SingleFlight, create_single_flight
+from services.hedging import HedgingPolicy, create_hedging_policy
+from services.circuit_breaker import CircuitBreaker, create_circuit_breaker
+from services.result_archive import ResultArchive, create_result_archive
+from services.preflight import Preflight, PreflightRejected, create_preflight
+from services.telemetry import Telemetry, telemetry as default_telemetry
+from contextlib import asynccontextmanager, nullcontext
+from models import ContractFields
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional
+import asyncio
+import time
 import os
 import logging
 
 class ContractService:
-    def __init__(self):
-        self.doc_client = DocumentIntelligenceClient(
-            endpoint=os.getenv('DOC_ENDPOINT'),
-            credential=AzureKeyCredential(os.getenv('DOC_API_KEY'))
-        )
-        self.account_name = os.getenv('BLOB_ACCOUNT_URL')
+    model_id = "prebuilt-contract"
+
+    # Bump when the extraction changes so the cached results are not reused
+    extraction_version = "5"
+
+    extractor = FieldExtractor(ContractFields, prebuilt_fields=PREBUILT_CONTRACT_FIELDS)
+
+    def __init__(self,
+                 clients:Optional[ClientFactory]=None,
+                 cache:Optional[ResultCache]=None,
+                 rate_limiter:Optional[AdaptiveRateLimiter]=None,
+                 polling_strategy:Optional[PollingStrategy]=None,
+                 telemetry:Optional[Telemetry]=None,
+                 single_flight:Optional[SingleFlight]=None,
+                 document_input:Optional[DocumentInput]=None,
+                 page_splitter:Optional[PageSplitter]=None,
+                 hedging:Optional[HedgingPolicy]=None,
+                 circuit_breaker:Optional[CircuitBreaker]=None,
+                 archive:Optional[ResultArchive]=None,
+                 preflight:Optional[Preflight]=None):
+        self.telemetry = telemetry or default_telemetry
+        # Shared by every request of the worker so the limit converges under
+        # the Document Intelligence quota
+        self.rate_limiter = rate_limiter if rate_limiter is not None else create_rate_limiter()
+        if clients is None:
+            policies = [ThrottlingFeedbackPolicy(self.rate_limiter)] if self.rate_limiter else None
+            clients = ClientFactory(doc_policies=policies, telemetry=self.telemetry)
+        self.clients = clients
+        self.cache = cache if cache is not None else create_result_cache(self.clients)
+        self.polling_strategy = polling_strategy or create_polling_strategy()
+        self.polling_metrics = PollingMetrics()
+        self.document_input = document_input or create_document_input(self.clients)
+        # Large contracts are analyzed by page ranges in parallel
+        self.page_splitter = page_splitter if page_splitter is not None else create_page_splitter()
+        # Concurrent analyses of the same blob (or content) share one operation
+        self.single_flight = single_flight if single_flight is not None else create_single_flight()
+        # A slow operation gets a second one, an unhealthy service fails fast
+        self.hedging = hedging if hedging is not None else create_hedging_policy()
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else create_circuit_breaker()
+        # Raw analyze results, for an extraction again without Document Intelligence
+        self.archive = archive if archive is not None else create_result_archive(self.clients)
+        # Blobs that are not contracts are skipped before any billable call
+        self.preflight = preflight if preflight is not None else create_preflight()
         self.container_name = os.getenv('CONTAINER_NAME')
 
-    async def analyze_contract(self,file_name:str) -> ContractFields:
+    def stats(self) -> Dict[str, Dict]:
+        stats = {
+            "polling": self.polling_metrics.stats(),
+            "document_input": self.document_input.stats(),
+            "stages": self.telemetry.stats()
+        }
+        if self.cache:
+            stats["cache"] = self.cache.stats()
+        if self.single_flight:
+            stats["single_flight"] = self.single_flight.stats()
+        if self.page_splitter:
+            stats["page_splitter"] = self.page_splitter.stats()
+        if self.hedging:
+            stats["hedging"] = self.hedging.stats()
+        if self.circuit_breaker:
+            stats["circuit_breaker"] = self.circuit_breaker.stats()
+        if self.archive:
+            stats["archive"] = self.archive.stats()
+        if self.preflight:
+            stats["preflight"] = self.preflight.stats()
+        if self.rate_limiter:
+            stats["rate_limiter"] = {
+                "limit": int(self.rate_limiter.limit),
+                "in_flight": self.rate_limiter.in_flight,
+                "throttled": self.rate_limiter.throttled
+            }
+        return stats
+
+    async def close(self):
+        if self.cache:
+            await self.cache.close()
+        if self.archive:
+            await self.archive.close()
+        await self.clients.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def analyze_contract(self,file_name:str, semaphore:Optional[asyncio.Semaphore]=None, background:bool=False) -> ContractFields:
+        # The semaphore is only held by the analysis itself, not while waiting
+        # for the same analysis already in flight. A background analysis (queue,
+        # push indexing) is not bound by the timeout of the skill.
+        budget = self.polling_strategy.background_deadline if background else self.polling_strategy.deadline
+        # One absolute deadline (loop time) for the whole record: the wait for
+        # the semaphore and a slot of the limiter, the document input, every
+        # page range and hedge
+        deadline = asyncio.get_running_loop().time() + budget if budget is not None else None
 
         try:
-            
-            blob = BlobClient(
-                account_url=self.account_name,
-                container_name=self.container_name,
-                blob_name=file_name,
-                credential=DefaultAzureCredential()
-            )
+            with self.telemetry.stage("analyze_contract", file_name=file_name):
+                async with self._deadline(file_name, deadline):
+                    return await self._analyze_contract(file_name, semaphore, deadline)
+        except PreflightRejected:
+            # Logged by the pre-flight checks, not a failure
+            raise
+        except Exception:
+            logging.exception(f"The analysis of {file_name} failed")
+            raise
+
+    @staticmethod
+    @asynccontextmanager
+    async def _deadline(file_name:str, deadline:Optional[float]):
+        timeout = asyncio.timeout_at(deadline)
+        try:
+            async with timeout:
+                yield
+        except TimeoutError as ex:
+            if not timeout.expired():
+                raise
+            raise TimeoutError(f"The analysis of {file_name} did not complete before its deadline") from ex
+
+    async def _analyze_contract(self, file_name:str, semaphore:Optional[asyncio.Semaphore], deadline:Optional[float]) -> ContractFields:
+        with self.telemetry.stage("blob_url"):
+            blob = self.clients.get_container_client(self.container_name).get_blob_client(file_name)
+
+        properties = None
+        if self.cache or self.archive or self.preflight or self.page_splitter or (self.single_flight and self.single_flight.mode == "content"):
+            with self.telemetry.stage("blob_properties"):
+                properties = await blob.get_blob_properties()
+
+        cache_key = None
+        if self.cache:
+            cache_key = self._cache_key(file_name, properties)
+            with self.telemetry.stage("cache_lookup"):
+                contract_fields = await self.cache.get(cache_key)
+            if contract_fields:
+                return contract_fields
+
+        if self.preflight:
+            with self.telemetry.stage("preflight"):
+                await self.preflight.check(blob, properties)
+
+        if not self.single_flight:
+            return await self._analyze_blob(file_name, blob, properties, cache_key, semaphore, deadline)
+
+        contract_fields, shared = await self.single_flight.do(
+            self._flight_key(file_name, properties),
+            lambda: self._analyze_blob(file_name, blob, properties, cache_key, semaphore, deadline)
+        )
+
+        # A copy under another name is cached under its own key too
+        if shared and cache_key and self.single_flight.mode == "content":
+            with self.telemetry.stage("cache_store"):
+                await self.cache.set(cache_key, contract_fields)
+
+        return contract_fields
+
+    async def _analyze_blob(self, file_name:str, blob:BlobClient, properties:Optional[BlobProperties], cache_key:Optional[str], semaphore:Optional[asyncio.Semaphore], deadline:Optional[float]) -> ContractFields:
+        # A shared flight runs in its own task, bound by the deadline of the
+        # caller that started it
+        async with self._deadline(file_name, deadline):
+            async with semaphore or nullcontext():
+                return await self._analyze_document(file_name, blob, properties, cache_key, deadline)
+
+    async def _analyze_document(self, file_name:str, blob:BlobClient, properties:Optional[BlobProperties], cache_key:Optional[str], deadline:Optional[float]) -> ContractFields:
+        # Before reading the blob, nothing is sent while the circuit is open
+        trial = self.circuit_breaker.check() if self.circuit_breaker else None
+        try:
+            content = None
+            ranges:List[Optional[str]] = [None]
+            if self.page_splitter:
+                with self.telemetry.stage("page_count"):
+                    # Downloaded once when the document is sent as bytes,
+                    # otherwise the page count is read by ranges
+                    if self.document_input.mode == "bytes":
+                        content = await self.document_input.download(blob)
+                        page_count = count_pdf_pages(content)
+                    else:
+                        page_count = await blob_page_count(blob, properties.size)
+                    ranges = self.page_splitter.page_ranges(page_count)
+
+            results = await asyncio.gather(*[
+                self._analyze_pages(file_name, blob, content, pages, deadline) for pages in ranges
+            ])
+        finally:
+            # A trial of the half-open circuit ended without a verdict (client
+            # error, throttling, cancellation) lets another one through
+            if trial is not None:
+                self.circuit_breaker.end_trial(trial)
 
-            poller = await self.doc_client.begin_analyze_document(
-                model_id="prebuilt-contract",
-                body=AnalyzeDocumentRequest(url_source=blob.url)
-                #query_fields=[]  # Todo
+        if self.archive:
+            await self._archive(file_name, properties, results)
+
+        with self.telemetry.stage("extraction"):
+            contract_fields = self.extract_results(results)
+
+        if cache_key:
+            with self.telemetry.stage("cache_store"):
+                await self.cache.set(cache_key, contract_fields)
+
+        return contract_fields
+
+    @classmethod
+    def extract_results(cls, results:List[Mapping[str, Any]]) -> ContractFields:
+        # The analyze results of the document, one per page range, as SDK
+        # models or their raw JSON
+        if len(results) == 1:
+            return cls.extractor.extract(results[0]["documents"][0])
+        return cls.extractor.extract_parts([result["documents"][0] for result in results if result.get("documents")])
+
+    async def _archive(self, file_name:str, properties:BlobProperties, results:List[AnalyzeResult]):
+        # A failure only costs an analysis again for the next re-extraction
+        try:
+            with self.telemetry.stage("archive_store"):
+                await self.archive.put(
+                    file_name,
+                    properties.etag,
+                    self._content_version(properties),
+                    self.model_id,
+                    [result.as_dict() for result in results]
+                )
+        except Exception:
+            logging.exception(f"The analyze result of {file_name} could not be archived")
+
+    async def _analyze_pages(self, file_name:str, blob:BlobClient, content:Optional[bytes], pages:Optional[str], deadline:Optional[float]) -> AnalyzeResult:
+        # URL, SAS URL or the downloaded document, before taking a slot of the limiter
+        with self.telemetry.stage("document_input", mode=self.document_input.mode):
+            analyze_arguments = await self.document_input.analyze_arguments(blob, content)
+        if pages:
+            analyze_arguments["pages"] = pages
+
+        def operation() -> Awaitable[AnalyzeResult]:
+            return self._analyze_operation(file_name, analyze_arguments, pages, deadline)
+
+        async with self._slot():
+            if not self.hedging:
+                return await operation()
+
+            # Only the operation is timed and hedged, not the wait for the
+            # slot. The hedge takes its own slot and is not started while the
+            # limiter is saturated.
+            return await self.hedging.run(
+                operation,
+                hedge_call=lambda: self._in_slot(operation),
+                can_hedge=lambda: not self.rate_limiter or not self.rate_limiter.saturated
             )
 
-            contract = await poller.result()
+    @asynccontextmanager
+    async def _slot(self):
+        waiting_since = time.perf_counter()
+        async with self.rate_limiter.slot() if self.rate_limiter else nullcontext():
+            self.telemetry.record("rate_limit_wait", time.perf_counter() - waiting_since)
+            yield
+
+    async def _in_slot(self, operation:Callable[[], Awaitable[AnalyzeResult]]) -> AnalyzeResult:
+        async with self._slot():
+            return await operation()
 
-            doc = contract.documents[0]
+    async def _analyze_operation(self, file_name:str, analyze_arguments:Dict[str, Any], pages:Optional[str], deadline:Optional[float]) -> AnalyzeResult:
+        doc_client = self.clients.get_document_intelligence_client()
+        started_at = time.perf_counter()
+        try:
+            with self.telemetry.stage("analyze_submit", pages=pages):
+                poller = await doc_client.begin_analyze_document(
+                    model_id=self.model_id,
+                    polling=self.polling_strategy.polling_method(self.clients.doc_endpoint, range_page_count(pages)),
+                    **analyze_arguments,
+                    **self._analyze_options()
+                )
 
-            return self._extract_schema_document(doc)
-                      
+            with self.telemetry.stage("polling_wait", pages=pages):
+                result = await poller.result()
         except Exception as ex:
-            raise logging.error(ex)
-    
-    def _extract_schema_document(self,doc:AnalyzedDocument) -> ContractFields:
-
-        contract_fields:ContractFields = ContractFields()
-
-        if doc.doc_type:
-            contract_fields.doc_type = doc.doc_type
-
-        title = doc.fields.get("Title")
-        if title:
-            contract_fields.title = title.value_string
-
-        contract_id = doc.fields.get("ContractId")
-        if contract_id:
-            contract_fields.contract_id = contract_id.value_string
-
-        execution_date = doc.fields.get("ExecutionDate")
-        if execution_date:
-            contract_fields.execution_date = execution_date.value_string
-
-        effective_date = doc.fields.get("EffectiveDate")
-        if effective_date:
-            contract_fields.effective_date = effective_date.value_string
-
-        expiration_date = doc.fields.get("ExpirationDate")
-        if expiration_date:
-            contract_fields.expiration_date = expiration_date.value_string
-
-        contract_duration = doc.fields.get("ContractDuration")
-        if contract_duration:
-            contract_fields.contract_duration = contract_duration.value_string
-
-        renewal_date = doc.fields.get("RenewalDate")
-        if renewal_date:
-            contract_fields.renewal_date = renewal_date.value_string
-
-        parties = doc.fields.get("Parties")
-        if parties:
-            contract_parties:List[Party] = []
-            for party_idx, party in enumerate(parties.value_array):
-                contract_party = Party()
-                
-                if party.value_object:
-                    name = party.value_object.get("Name")
-                    if name:
-                        contract_party.name = name.value_string
-                    
-                    address = party.value_object.get("Address")
-                    if address:
-                        contract_party.address = address.value_string
-                    
-                    reference_name = party.value_object.get("ReferenceName")
-                    if reference_name:
-                        contract_party.reference_name = reference_name.value_string
-                    
-                    clause = party.value_object.get("Clause")
-                    if clause:
-                        contract_party.clause = clause.value_string
-                else:
-                    # Fallback if party is a string
-                    contract_party.name = party.value_string
-                
-                contract_parties.append(contract_party)
-            contract_fields.parties = contract_parties
-
-        jurisdictions = doc.fields.get("Jurisdictions")
-        if jurisdictions:
-            contract_jurisdictions:List[Jurisdiction] = []
-            for jurisdiction_idx, jurisdiction in enumerate(jurisdictions.value_array):
-                jurisdiction_obj = Jurisdiction()
-                if jurisdiction.value_object:
-                    region = jurisdiction.value_object.get("Region")
-                    if region:
-                        jurisdiction_obj.region = region.value_string
-                    
-                    clause = jurisdiction.value_object.get("Clause")
-                    if clause:
-                        jurisdiction_obj.clause = clause.value_string
-                else:
-                    # Fallback if jurisdiction is a string
-                    jurisdiction_obj.region = jurisdiction.value_string
-                
-                contract_jurisdictions.append(jurisdiction_obj)
-            
-            contract_fields.jurisdictions = contract_jurisdictions
+            if self.circuit_breaker:
+                self.circuit_breaker.on_failure(ex)
+            raise
+        except asyncio.CancelledError:
+            # Cut by the deadline of the record (not a lost hedge): the
+            # service was too slow
+            if self.circuit_breaker and deadline is not None and asyncio.get_running_loop().time() >= deadline:
+                self.circuit_breaker.on_failure(TimeoutError(f"The analysis of {file_name} (pages {pages or 'all'}) passed its deadline"))
+            raise
 
-        return contract_fields
+        if self.circuit_breaker:
+            self.circuit_breaker.on_success()
+
+        self.polling_metrics.record(poller, started_at)
+        return result
+
+    def _analyze_options(self) -> Dict[str, Any]:
+        if not self.extractor.query_fields:
+            return {}
+
+        return {
+            "features": [DocumentAnalysisFeature.QUERY_FIELDS],
+            "query_fields": self.extractor.query_fields
+        }
+
+    async def get_cached_contract(self, file_name:str, preflight:bool=False) -> Optional[ContractFields]:
+        # With preflight, a contract not in the cache is also checked with the
+        # same blob properties, PreflightRejected when it would not be analyzed
+        preflight = preflight and self.preflight is not None
+        if not self.cache and not preflight:
+            return None
+
+        blob = self.clients.get_container_client(self.container_name).get_blob_client(file_name)
+        properties = await blob.get_blob_properties()
+        if self.cache:
+            contract_fields = await self.cache.get(self._cache_key(file_name, properties))
+            if contract_fields:
+                return contract_fields
+
+        if preflight:
+            await self.preflight.check(blob, properties)
+        return None
+
+    def _flight_key(self, file_name:str, properties:Optional[BlobProperties]) -> str:
+        if self.single_flight.mode == "content" and properties is not None:
+            content_md5 = properties.content_settings.content_md5
+            if content_md5:
+                return f"md5:{bytes(content_md5).hex()}"
+        return f"name:{file_name}"
+
+    def _cache_key(self, file_name:str, properties:BlobProperties) -> str:
+        return self.result_key(file_name, self._content_version(properties))
+
+    @classmethod
+    def result_key(cls, file_name:str, content_version:str) -> str:
+        # Key of the result cache, also used by the re-extraction
+        return f"{cls.model_id}:{cls.extraction_version}:{file_name}:{content_version}"
+
+    @staticmethod
+    def _content_version(properties:BlobProperties) -> str:
+        # The MD5 identifies the content itself, the ETag is used for blobs
+        # uploaded without it (large block uploads)
+        content_md5 = properties.content_settings.content_md5
+        return bytes(content_md5).hex() if content_md5 else properties.etag.strip('"')
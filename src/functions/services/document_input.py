@@ -0,0 +1,117 @@
+from azure.ai.documentintelligence.models import AnalyzeDocumentRequest
+from azure.storage.blob import BlobSasPermissions, UserDelegationKey, generate_blob_sas
+from azure.storage.blob.aio import BlobClient
+from services.client_factory import ClientFactory
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+import asyncio
+import io
+import os
+
+# How the contract is given to Document Intelligence:
+# - url: the blob URL, read by Document Intelligence with its own identity
+# - sas: the blob URL with a read SAS signed by a cached user delegation key
+#   (or the account key with a connection string)
+# - bytes: the blob is downloaded by the pooled storage client in parallel
+#   chunks and sent in the analyze request, for a Document Intelligence
+#   resource that cannot reach the storage account
+class DocumentInput:
+
+    def __init__(self,
+                 clients:ClientFactory,
+                 mode:str="url",
+                 download_concurrency:int=4,
+                 sas_ttl:float=900,
+                 delegation_key_ttl:float=6 * 3600):
+        if mode not in ("url", "sas", "bytes"):
+            raise ValueError(f"Unknown DOC_INPUT_MODE value: {mode}")
+        self.clients = clients
+        self.mode = mode
+        self.download_concurrency = download_concurrency
+        self.sas_ttl = sas_ttl
+        self.delegation_key_ttl = delegation_key_ttl
+        self.downloaded_bytes = 0
+        self._delegation_key:Optional[UserDelegationKey] = None
+        self._delegation_key_expiry:Optional[datetime] = None
+        self._delegation_key_lock = asyncio.Lock()
+
+    async def analyze_arguments(self, blob:BlobClient, content:Optional[bytes]=None) -> Dict[str, Any]:
+        # Arguments of begin_analyze_document giving it the document, content
+        # is the document already downloaded (e.g. to read its page count)
+        if self.mode == "url":
+            return {"body": AnalyzeDocumentRequest(url_source=blob.url)}
+
+        if self.mode == "sas":
+            return {"body": AnalyzeDocumentRequest(url_source=f"{blob.url}?{await self._sas_token(blob)}")}
+
+        # One stream per operation, sharing the memory of the downloaded document
+        stream = io.BytesIO(content) if content is not None else await self._download(blob)
+        return {"body": stream, "content_type": "application/octet-stream"}
+
+    async def download(self, blob:BlobClient) -> bytes:
+        downloader = await blob.download_blob(max_concurrency=self.download_concurrency)
+        content = await downloader.readall()
+        self.downloaded_bytes += len(content)
+        return content
+
+    async def _download(self, blob:BlobClient) -> io.BytesIO:
+        downloader = await blob.download_blob(max_concurrency=self.download_concurrency)
+
+        # Sized once so the chunks are written in place, the same buffer is
+        # then streamed to Document Intelligence (and rewound by the retries)
+        stream = io.BytesIO()
+        if downloader.size:
+            stream.seek(downloader.size - 1)
+            stream.write(b"\0")
+            stream.seek(0)
+        await downloader.readinto(stream)
+        stream.seek(0)
+
+        self.downloaded_bytes += downloader.size or 0
+        return stream
+
+    async def _sas_token(self, blob:BlobClient) -> str:
+        now = datetime.now(timezone.utc)
+        expiry = now + timedelta(seconds=self.sas_ttl)
+        # Tolerates a clock skew with the storage service
+        start = now - timedelta(minutes=5)
+        permission = BlobSasPermissions(read=True)
+
+        account_key = getattr(blob.credential, "account_key", None)
+        if account_key:
+            return generate_blob_sas(blob.account_name, blob.container_name, blob.blob_name,
+                                     account_key=account_key, permission=permission,
+                                     expiry=expiry, start=start)
+
+        return generate_blob_sas(blob.account_name, blob.container_name, blob.blob_name,
+                                 user_delegation_key=await self._user_delegation_key(expiry),
+                                 permission=permission, expiry=expiry, start=start)
+
+    async def _user_delegation_key(self, valid_until:datetime) -> UserDelegationKey:
+        # One key for all the SAS of the worker, renewed when it would expire
+        # before the SAS signed with it
+        async with self._delegation_key_lock:
+            if self._delegation_key is None or self._delegation_key_expiry <= valid_until:
+                now = datetime.now(timezone.utc)
+                expiry = now + timedelta(seconds=max(self.delegation_key_ttl, self.sas_ttl * 2))
+                self._delegation_key = await self.clients.get_blob_service_client().get_user_delegation_key(
+                    key_start_time=now - timedelta(minutes=5),
+                    key_expiry_time=expiry
+                )
+                self._delegation_key_expiry = expiry
+            return self._delegation_key
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "downloaded_bytes": self.downloaded_bytes
+        }
+
+def create_document_input(clients:ClientFactory) -> DocumentInput:
+    return DocumentInput(
+        clients=clients,
+        mode=os.getenv('DOC_INPUT_MODE', 'url').lower(),
+        download_concurrency=int(os.getenv('BLOB_DOWNLOAD_CONCURRENCY', '4')),
+        sas_ttl=float(os.getenv('DOC_SAS_TTL', '900')),
+        delegation_key_ttl=float(os.getenv('DOC_SAS_KEY_TTL', str(6 * 3600)))
+    )
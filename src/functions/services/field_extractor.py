@@ -0,0 +1,305 @@
+from azure.ai.documentintelligence.models import AnalyzedDocument
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Type, Union, get_args, get_origin
+import re
+
+# Fields returned by the prebuilt-contract model, any other field of the
+# models is requested as a query field
+PREBUILT_CONTRACT_FIELDS = {
+    "Title", "ContractId", "Parties", "ExecutionDate", "EffectiveDate",
+    "ExpirationDate", "ContractDuration", "RenewalDate", "Jurisdictions"
+}
+
+# The readers work on the raw JSON of the fields (the SDK models are
+# mappings), the typed properties of the SDK deserialize the value on every
+# access and cost more than the rest of the extraction.
+Reader = Callable[[Mapping[str, Any]], Any]
+
+def _unwrap_optional(annotation:Any) -> Any:
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+def _is_model(annotation:Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+def _field_options(field_info:FieldInfo) -> Dict[str, Any]:
+    extra = field_info.json_schema_extra
+    return extra if isinstance(extra, dict) else {}
+
+def _source_name(name:str, field_info:FieldInfo) -> Optional[str]:
+    # By convention the Document Intelligence field is the PascalCase of the
+    # alias (contractId -> ContractId), the models can override it with di_field
+    options = _field_options(field_info)
+    if "di_field" in options:
+        return options["di_field"]
+
+    key = field_info.alias or name
+    return key[0].upper() + key[1:]
+
+def _read_string(field:Mapping[str, Any]) -> Optional[str]:
+    # Dates and numbers have no valueString, their text is in content
+    value = field.get("valueString")
+    return value if value is not None else field.get("content")
+
+def _read_date(field:Mapping[str, Any]) -> Optional[str]:
+    # ISO 8601 date, converted by the validation of the model
+    return field.get("valueDate")
+
+# Formats of the dates in the text of the contracts, after the ordinals and
+# "day of" are removed ("19th day of August, 2025" -> "19 August, 2025")
+DATE_FORMATS = (
+    "%B %d, %Y", "%B %d %Y", "%b %d, %Y", "%b %d %Y", "%d %B, %Y", "%d %B %Y",
+    "%d %b %Y", "%Y-%m-%d", "%m/%d/%Y", "%m-%d-%Y", "%d.%m.%Y"
+)
+ORDINAL = re.compile(r"(\d)(st|nd|rd|th)\b", re.IGNORECASE)
+DAY_OF = re.compile(r"\s+day\s+of\s+", re.IGNORECASE)
+
+# The same few dates come back in many contracts, the parsing is cached
+@lru_cache(maxsize=4096)
+def parse_date(text:str) -> Optional[datetime]:
+    text = " ".join(DAY_OF.sub(" ", ORDINAL.sub(r"\1", text)).split())
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return None
+
+def _read_datetime(field:Mapping[str, Any]) -> Optional[datetime]:
+    # Midnight UTC (Edm.DateTimeOffset), from valueDate or else the text
+    value = field.get("valueDate")
+    if value:
+        try:
+            return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    content = field.get("valueString") or field.get("content")
+    return parse_date(content) if content else None
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90
+}
+MONTHS_PER_UNIT = {"year": 12, "month": 1, "week": 12 / 52, "day": 12 / 365}
+# "12 months", "two (2) years", "eighteen-month", "1 year and 6 months"
+DURATION = re.compile(r"(\d+(?:\.\d+)?|[a-z]+(?:-[a-z]+)?)\s*(?:\(\s*\d+\s*\)\s*)?-?\s*(year|month|week|day)s?\b", re.IGNORECASE)
+
+def _number(text:str) -> Optional[float]:
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    words = [NUMBER_WORDS.get(word) for word in text.lower().split("-")]
+    return sum(words) if words and None not in words else None
+
+# Parts of one duration ("1 year and 6 months"), anything else ends it
+DURATION_JOIN = re.compile(r"\s*(?:,|and|plus|&)?\s*", re.IGNORECASE)
+
+@lru_cache(maxsize=4096)
+def parse_months(text:str) -> Optional[float]:
+    # The first duration of the text, the term of the contract: the renewal
+    # or notice periods after it ("36 months, renewable for 12 month
+    # periods") are not added
+    months = None
+    end = None
+    for match in DURATION.finditer(text):
+        if end is not None and not DURATION_JOIN.fullmatch(text, end, match.start()):
+            break
+        value = _number(match.group(1))
+        if value is None:
+            if months is not None:
+                break
+            continue
+        months = (months or 0) + value * MONTHS_PER_UNIT[match.group(2).lower()]
+        end = match.end()
+    return round(months, 2) if months is not None else None
+
+def _read_months(field:Mapping[str, Any]) -> Optional[float]:
+    content = _read_string(field)
+    return parse_months(content) if content else None
+
+def _read_number(field:Mapping[str, Any]) -> Optional[float]:
+    value = field.get("valueNumber")
+    return value if value is not None else field.get("valueInteger")
+
+def _read_integer(field:Mapping[str, Any]) -> Optional[int]:
+    value = field.get("valueInteger")
+    if value is None and field.get("valueNumber") is not None:
+        value = int(field["valueNumber"])
+    return value
+
+def _normalize(value:Any) -> Any:
+    # Same party or jurisdiction whatever the case and punctuation
+    if isinstance(value, str):
+        return " ".join(re.sub(r"[^\w\s]", " ", value).casefold().split())
+    return value
+
+def _item_key(item:Any, merge_key:Optional[str]) -> Any:
+    if not isinstance(item, dict):
+        return _normalize(item)
+    if merge_key and item.get(merge_key):
+        return _normalize(item[merge_key])
+    # Without its merge key, only the same object twice
+    return tuple(sorted((name, repr(_normalize(value))) for name, value in item.items()))
+
+def _merge_items(items:List[Any], new_items:List[Any], merge_key:Optional[str]=None) -> List[Any]:
+    # Union keeping the first occurrence, an object is identified by its
+    # merge_key field (the name of a party) and completed by the later
+    # occurrences
+    index = {_item_key(item, merge_key): item for item in items}
+
+    for item in new_items:
+        key = _item_key(item, merge_key)
+        existing = index.get(key)
+        if existing is None:
+            index[key] = item
+            items.append(item)
+        elif isinstance(existing, dict):
+            for name, value in item.items():
+                if existing.get(name) is None:
+                    existing[name] = value
+    return items
+
+SCALAR_READERS:Dict[Any, Reader] = {
+    str: _read_string,
+    date: _read_date,
+    datetime: _read_datetime,
+    float: _read_number,
+    int: _read_integer,
+}
+
+# Readers selected by the di_format option of a field, for a value parsed from
+# the text of the field (the duration of a contract is a string)
+FORMAT_READERS:Dict[str, Reader] = {
+    "months": _read_months,
+}
+
+# Compiles once the mapping between a pydantic model and the fields of an
+# analyzed document into a list of readers. Extracting a document is a single
+# pass over that list followed by one validation of the model.
+class FieldExtractor:
+    def __init__(self, model:Type[BaseModel], prebuilt_fields:Optional[set]=None):
+        self.model = model
+        self.captures_confidence = "confidence" in model.model_fields
+        self.readers:List[Tuple[str, str, Reader]] = []
+        self.query_fields:List[str] = []
+        # Field identifying the objects of a list merged by extract_parts
+        self.merge_keys:Dict[str, str] = {}
+
+        for name, field_info in model.model_fields.items():
+            source = _source_name(name, field_info)
+            if field_info.exclude or source is None:
+                continue
+
+            key = field_info.alias or name
+            options = _field_options(field_info)
+            self.readers.append((key, source, self._compile(field_info.annotation, options)))
+            if "di_merge_key" in options:
+                self.merge_keys[key] = options["di_merge_key"]
+
+            if prebuilt_fields is not None and source not in prebuilt_fields and source != "docType":
+                self.query_fields.append(source)
+
+    def _compile(self, annotation:Any, options:Dict[str, Any]) -> Reader:
+        annotation = _unwrap_optional(annotation)
+
+        if get_origin(annotation) in (list, List):
+            item_reader = self._compile_item(_unwrap_optional(get_args(annotation)[0]), options)
+
+            def read_array(field:Mapping[str, Any]) -> List[Any]:
+                return [item_reader(item) for item in field.get("valueArray") or []]
+            return read_array
+
+        if _is_model(annotation):
+            return FieldExtractor(annotation).read_object
+
+        if "di_format" in options:
+            return FORMAT_READERS[options["di_format"]]
+
+        return SCALAR_READERS.get(annotation, _read_string)
+
+    def _compile_item(self, annotation:Any, options:Dict[str, Any]) -> Reader:
+        if _is_model(annotation):
+            return FieldExtractor(annotation).read_object
+
+        scalar_reader = SCALAR_READERS.get(annotation, _read_string)
+        item_field = options.get("di_item_field")
+        if not item_field:
+            return scalar_reader
+
+        # Arrays of objects mapped to a list of scalars keep one property of
+        # each object (Jurisdictions -> Region)
+        def read_item(field:Mapping[str, Any]) -> Any:
+            values = field.get("valueObject")
+            if values is None:
+                return scalar_reader(field)
+            value = values.get(item_field)
+            return scalar_reader(value) if value is not None else None
+        return read_item
+
+    def read_object(self, field:Mapping[str, Any]) -> Dict[str, Any]:
+        values = field.get("valueObject")
+        if values is None:
+            # Fallback when the service returns a string instead of an object,
+            # the text goes to the first field of the model
+            return {self.readers[0][0]: _read_string(field)}
+        return self._read(values, None)
+
+    def _read(self, fields:Mapping[str, Any], doc_type:Optional[str]) -> Dict[str, Any]:
+        values:Dict[str, Any] = {}
+        confidence:Dict[str, float] = {}
+
+        for key, source, reader in self.readers:
+            if source == "docType":
+                if doc_type:
+                    values[key] = doc_type
+                continue
+
+            field = fields.get(source)
+            if field is None:
+                continue
+
+            value = reader(field)
+            if value is not None:
+                values[key] = value
+            if self.captures_confidence and field.get("confidence") is not None:
+                confidence[source] = field["confidence"]
+
+        if self.captures_confidence:
+            values["confidence"] = confidence
+
+        return values
+
+    def extract(self, doc:AnalyzedDocument) -> BaseModel:
+        return self.model.model_validate(self._read(doc.get("fields") or {}, doc.get("docType")))
+
+    def extract_parts(self, docs:List[AnalyzedDocument]) -> BaseModel:
+        # Documents analyzed by page ranges, in page order: a single value
+        # comes from the earliest range having it, lists are merged
+        merged:Dict[str, Any] = {}
+        confidence:Dict[str, float] = {}
+
+        for doc in docs:
+            values = self._read(doc.get("fields") or {}, doc.get("docType"))
+            for source, value in values.pop("confidence", {}).items():
+                confidence[source] = max(confidence.get(source, value), value)
+
+            for key, value in values.items():
+                if isinstance(value, list):
+                    merged[key] = _merge_items(merged.get(key, []), value, self.merge_keys.get(key))
+                elif merged.get(key) in (None, ""):
+                    merged[key] = value
+
+        if self.captures_confidence:
+            merged["confidence"] = confidence
+
+        return self.model.model_validate(merged)
@@ -0,0 +1,117 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+import asyncio
+import logging
+import statistics
+import os
+
+T = TypeVar("T")
+
+# Hedged analyze operations: when an operation runs longer than the given
+# percentile of the recent latencies, a second one is started and the first
+# to complete wins, the other is cancelled. Every operation adds `budget`
+# tokens to a bucket and a hedge spends one, so the extra operations stay
+# under `budget` of the operations (0.05 is 5% more calls at most). No hedge
+# is started while can_hedge is false (e.g. the rate limiter has no slot left).
+class HedgingPolicy:
+
+    def __init__(self,
+                 percentile:int=95,
+                 min_delay:float=2,
+                 budget:float=0.05,
+                 min_samples:int=20,
+                 max_samples:int=256):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget = budget
+        self.min_samples = min_samples
+        self.operations = 0
+        self.hedged = 0
+        self.hedge_won = 0
+        self.over_budget = 0
+        self.saturated = 0
+        self._latencies:Deque[float] = deque(maxlen=max_samples)
+        # Starts with one hedge available
+        self._tokens = 1.0
+
+    def delay(self) -> Optional[float]:
+        # Not hedged until the latencies are known
+        if len(self._latencies) < self.min_samples:
+            return None
+        threshold = statistics.quantiles(self._latencies, n=100, method="inclusive")[self.percentile - 1]
+        return max(self.min_delay, threshold)
+
+    def record(self, seconds:float):
+        self._latencies.append(seconds)
+
+    def _take_token(self) -> bool:
+        if self._tokens < 1:
+            self.over_budget += 1
+            return False
+        self._tokens -= 1
+        return True
+
+    async def run(self,
+                  call:Callable[[], Awaitable[T]],
+                  hedge_call:Optional[Callable[[], Awaitable[T]]]=None,
+                  can_hedge:Optional[Callable[[], bool]]=None) -> T:
+        # hedge_call starts the second operation, call when not given
+        self.operations += 1
+        self._tokens = min(10.0, self._tokens + self.budget)
+
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        delay = self.delay()
+        tasks = {asyncio.ensure_future(call())}
+        hedge = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and can_hedge is not None and not can_hedge():
+                self.saturated += 1
+            elif not done and self._take_token():
+                self.hedged += 1
+                logging.info(f"Analyze operation still running after {delay:.1f}s, hedged with a second one")
+                hedge = asyncio.ensure_future((hedge_call or call)())
+                tasks.add(hedge)
+
+            while True:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                # The first success wins, a failure waits for the other one
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is None and tasks:
+                    continue
+                winner = winner or done.pop()
+                result = winner.result()
+                if winner is hedge:
+                    self.hedge_won += 1
+                self.record(loop.time() - started_at)
+                return result
+        finally:
+            # The loser (or both, when the caller is cancelled)
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.delay()
+        return {
+            "operations": self.operations,
+            "hedged": self.hedged,
+            "hedge_won": self.hedge_won,
+            "over_budget": self.over_budget,
+            "saturated": self.saturated,
+            "delay": round(delay, 3) if delay is not None else None
+        }
+
+def create_hedging_policy() -> Optional[HedgingPolicy]:
+    percentile = int(os.getenv('DOC_HEDGE_PERCENTILE', '0'))
+    if percentile <= 0:
+        return None
+    if percentile >= 100:
+        raise ValueError(f"DOC_HEDGE_PERCENTILE must be under 100: {percentile}")
+
+    return HedgingPolicy(
+        percentile=percentile,
+        min_delay=float(os.getenv('DOC_HEDGE_MIN_DELAY', '2')),
+        budget=float(os.getenv('DOC_HEDGE_BUDGET', '0.05')),
+        min_samples=int(os.getenv('DOC_HEDGE_MIN_SAMPLES', '20'))
+    )
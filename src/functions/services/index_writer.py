@@ -0,0 +1,210 @@
+from services.client_factory import ClientFactory
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+
+# Azure AI Search accepts up to 1000 actions and 16 MB per indexing request
+MAX_BATCH_DOCUMENTS = 1000
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+
+# Status of the documents of a batch worth sending again: conflicting update,
+# throttling, unavailable service
+RETRIABLE_STATUS = (409, 422, 429, 500, 503)
+
+# Action of a document of a batch, merge or upload when not set
+ACTION_FIELD = "@search.action"
+
+# Index receiving the pushed documents. upload merges or uploads (or deletes)
+# a batch and returns (key, succeeded, status code, error message) for each
+# document.
+class IndexTarget(ABC):
+    key_field = "id"
+
+    @abstractmethod
+    async def upload(self, documents:List[Dict[str, Any]]) -> List[Tuple[str, bool, int, Optional[str]]]:
+        ...
+
+    async def close(self):
+        pass
+
+class SearchIndexTarget(IndexTarget):
+    def __init__(self, clients:ClientFactory, index_name:str):
+        self.clients = clients
+        self.index_name = index_name
+
+    async def upload(self, documents:List[Dict[str, Any]]) -> List[Tuple[str, bool, int, Optional[str]]]:
+        # Only used by the push indexing, not loaded by the skill
+        from azure.search.documents import IndexDocumentsBatch
+
+        search_client = self.clients.get_search_client(self.index_name)
+        batch = IndexDocumentsBatch()
+        batch.add_merge_or_upload_actions([document for document in documents if ACTION_FIELD not in document])
+        batch.add_delete_actions([
+            {self.key_field: document[self.key_field]} for document in documents if document.get(ACTION_FIELD) == "delete"
+        ])
+        results = await search_client.index_documents(batch)
+        return [(result.key, result.succeeded, result.status_code, result.error_message) for result in results]
+
+# Local stand-in of the index, the documents are merged in memory and written
+# to a JSON file (when path is set) by close
+class JsonIndexTarget(IndexTarget):
+    def __init__(self, path:Optional[str]=None):
+        self.path = path
+        self.documents:Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                self.documents = {document[self.key_field]: document for document in json.load(file)}
+
+    async def upload(self, documents:List[Dict[str, Any]]) -> List[Tuple[str, bool, int, Optional[str]]]:
+        results = []
+        for document in documents:
+            key = document[self.key_field]
+            if document.get(ACTION_FIELD) == "delete":
+                # Deleting a missing document succeeds, as with Azure AI Search
+                self.documents.pop(key, None)
+                results.append((key, True, 200, None))
+                continue
+
+            existing = self.documents.get(key)
+            # Merge or upload: the fields sent replace the stored ones
+            self.documents[key] = {**existing, **document} if existing else dict(document)
+            results.append((key, True, 200 if existing else 201, None))
+        return results
+
+    async def close(self):
+        if self.path:
+            with open(self.path, 'w', encoding='utf-8') as file:
+                json.dump(list(self.documents.values()), file, indent=2)
+
+# Pushes documents to the index in batches of up to max_documents documents
+# and max_bytes of JSON. Only the documents of a batch that failed with a
+# retriable status are sent again, with an exponential backoff.
+class IndexWriter:
+
+    def __init__(self,
+                 target:IndexTarget,
+                 max_documents:int=MAX_BATCH_DOCUMENTS,
+                 max_bytes:int=MAX_BATCH_BYTES,
+                 max_retries:int=5,
+                 retry_delay:float=1):
+        self.target = target
+        self.max_documents = min(max_documents, MAX_BATCH_DOCUMENTS)
+        self.max_bytes = min(max_bytes, MAX_BATCH_BYTES)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.batches = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.deleted = 0
+        self.failed:Dict[str, str] = {}
+        # Called with each document (or delete action) once indexed
+        self.on_indexed:Optional[Callable[[Dict[str, Any]], None]] = None
+        self._batch:List[Dict[str, Any]] = []
+        # Size of the documents of the batch once serialized
+        self._batch_bytes = 0
+        self._lock = asyncio.Lock()
+
+    async def add(self, document:Dict[str, Any]):
+        size = len(json.dumps(document, separators=(',', ':')).encode('utf-8')) + 1
+        if size > self.max_bytes:
+            key = document[self.target.key_field]
+            self.failed[key] = f"Document of {size} bytes larger than an indexing batch"
+            logging.error(f"{key} not indexed: {self.failed[key]}")
+            return
+
+        # The full batch is sent by the caller adding the next document, the
+        # other callers keep filling a new one meanwhile
+        full = None
+        async with self._lock:
+            if self._batch and (len(self._batch) >= self.max_documents or self._batch_bytes + size > self.max_bytes):
+                full = self._take()
+            self._batch.append(document)
+            self._batch_bytes += size
+
+        if full:
+            await self._send(full)
+
+    async def delete(self, key:str):
+        await self.add({ACTION_FIELD: "delete", self.target.key_field: key})
+
+    async def flush(self):
+        async with self._lock:
+            batch = self._take()
+        if batch:
+            await self._send(batch)
+
+    def _take(self) -> List[Dict[str, Any]]:
+        batch = self._batch
+        self._batch = []
+        self._batch_bytes = 0
+        return batch
+
+    async def _send(self, documents:List[Dict[str, Any]]):
+        attempt = 0
+        while documents:
+            self.batches += 1
+            by_key = {document[self.target.key_field]: document for document in documents}
+            try:
+                results = await self.target.upload(documents)
+            except Exception as ex:
+                # The whole batch failed (network error, throttled request...)
+                results = [(key, False, getattr(ex, 'status_code', None) or 503, str(ex)) for key in by_key]
+
+            retry = []
+            for key, succeeded, status_code, error_message in results:
+                if succeeded:
+                    self.succeeded += 1
+                    if by_key[key].get(ACTION_FIELD) == "delete":
+                        self.deleted += 1
+                    if self.on_indexed:
+                        self.on_indexed(by_key[key])
+                    self.failed.pop(key, None)
+                elif status_code in RETRIABLE_STATUS and attempt < self.max_retries:
+                    retry.append(by_key[key])
+                else:
+                    self.failed[key] = f"{status_code}: {error_message}"
+                    logging.error(f"{key} not indexed: {self.failed[key]}")
+
+            if retry:
+                attempt += 1
+                self.retried += len(retry)
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+            documents = retry
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "deleted": self.deleted,
+            "failed": len(self.failed)
+        }
+
+    async def close(self):
+        await self.flush()
+        await self.target.close()
+
+def create_index_target(clients:ClientFactory) -> IndexTarget:
+    target_type = os.getenv('INDEX_TARGET', 'search').lower()
+
+    if target_type == 'search':
+        return SearchIndexTarget(clients, os.getenv('SEARCH_INDEX_NAME', 'contract'))
+
+    if target_type == 'json':
+        return JsonIndexTarget(os.getenv('INDEX_TARGET_PATH', 'index.json'))
+
+    if target_type == 'memory':
+        return JsonIndexTarget()
+
+    raise ValueError(f"Unknown INDEX_TARGET value: {target_type}")
+
+def create_index_writer(clients:ClientFactory) -> IndexWriter:
+    return IndexWriter(
+        create_index_target(clients),
+        max_documents=int(os.getenv('INDEX_BATCH_SIZE', str(MAX_BATCH_DOCUMENTS))),
+        max_bytes=int(os.getenv('INDEX_BATCH_MAX_BYTES', str(MAX_BATCH_BYTES - 64 * 1024))),
+        max_retries=int(os.getenv('INDEX_MAX_RETRIES', '5'))
+    )
@@ -0,0 +1,116 @@
+from pypdf import PdfReader
+from typing import TYPE_CHECKING, List, Optional
+import io
+import re
+import os
+
+if TYPE_CHECKING:
+    from azure.storage.blob.aio import BlobClient
+
+PDF_OBJECT = re.compile(rb"\d+\s+\d+\s+obj\b(.*?)\bendobj", re.DOTALL)
+PAGES_TYPE = re.compile(rb"/Type\s*/Pages\b")
+PAGE_TREE_COUNT = re.compile(rb"/Count\s+(\d+)")
+# Page count of a linearized PDF, in its first object
+LINEARIZED_PAGES = re.compile(rb"/Linearized\s.*?/N\s+(\d+)", re.DOTALL)
+
+def page_tree_count(content:bytes) -> Optional[int]:
+    # The /Count of the root of the page tree, the /Type /Pages object without
+    # a /Parent. The outlines also have a /Count (their visible bookmarks),
+    # above the page count in a contract with many bookmarks.
+    counts = []
+    for body in PDF_OBJECT.findall(content):
+        if not PAGES_TYPE.search(body):
+            continue
+        count = PAGE_TREE_COUNT.search(body)
+        if count is None:
+            continue
+        if b"/Parent" not in body:
+            return int(count.group(1))
+        counts.append(int(count.group(1)))
+    return max(counts) if counts else None
+
+def count_pdf_pages(content:bytes) -> Optional[int]:
+    try:
+        return len(PdfReader(io.BytesIO(content)).pages)
+    except Exception:
+        # A damaged PDF pypdf cannot read, unknown when the page tree is not
+        # found either (the document is then not split)
+        return page_tree_count(content)
+
+async def read_blob_range(blob:"BlobClient", offset:int, length:int) -> bytes:
+    if length <= 0:
+        return b""
+    downloader = await blob.download_blob(offset=offset, length=length)
+    return await downloader.readall()
+
+async def blob_page_count(blob:"BlobClient", size:int, probe_bytes:int=64 * 1024, head:Optional[bytes]=None) -> Optional[int]:
+    # Range reads of the first and last bytes of the blob, the whole blob only
+    # when it is small. A linearized PDF has its page count in its first
+    # object, otherwise the page tree is often written at the end, next to the
+    # xref table. Unknown when the objects are compressed.
+    if head is None:
+        head = await read_blob_range(blob, 0, min(size, probe_bytes))
+    if len(head) >= size:
+        return count_pdf_pages(head)
+
+    linearized = LINEARIZED_PAGES.search(head[:2048])
+    if linearized:
+        return int(linearized.group(1))
+
+    tail_offset = max(len(head), size - probe_bytes)
+    tail = await read_blob_range(blob, tail_offset, size - tail_offset)
+    return page_tree_count(head + tail)
+
+# Splits the large contracts in page ranges analyzed in parallel, the
+# `pages` parameter of the analyze operation
+class PageSplitter:
+
+    def __init__(self, pages_per_range:int=20, min_pages:int=40, max_ranges:int=8):
+        self.pages_per_range = pages_per_range
+        self.min_pages = min_pages
+        self.max_ranges = max_ranges
+        self.split_documents = 0
+        self.ranges = 0
+
+    def page_ranges(self, page_count:Optional[int]) -> List[Optional[str]]:
+        # [None] analyzes the whole document in one operation
+        if not page_count or page_count < self.min_pages:
+            return [None]
+
+        # Larger ranges rather than more operations than max_ranges
+        range_count = min(self.max_ranges, -(-page_count // self.pages_per_range))
+        if range_count < 2:
+            return [None]
+
+        size = -(-page_count // range_count)
+        ranges = [
+            f"{first}-{min(first + size - 1, page_count)}"
+            for first in range(1, page_count + 1, size)
+        ]
+
+        self.split_documents += 1
+        self.ranges += len(ranges)
+        return ranges
+
+    def stats(self):
+        return {
+            "split_documents": self.split_documents,
+            "ranges": self.ranges
+        }
+
+def range_page_count(pages:Optional[str]) -> Optional[int]:
+    if not pages:
+        return None
+    first, _, last = pages.partition("-")
+    return int(last or first) - int(first) + 1
+
+def create_page_splitter() -> Optional[PageSplitter]:
+    pages_per_range = int(os.getenv('DOC_SPLIT_PAGES', '0'))
+    if pages_per_range <= 0:
+        return None
+
+    return PageSplitter(
+        pages_per_range=pages_per_range,
+        min_pages=int(os.getenv('DOC_SPLIT_MIN_PAGES', str(pages_per_range * 2))),
+        max_ranges=int(os.getenv('DOC_SPLIT_MAX_RANGES', '8'))
+    )
@@ -0,0 +1,113 @@
+from azure.core.polling import AsyncLROPoller, AsyncPollingMethod
+from azure.core.polling.async_base_polling import AsyncLROBasePolling
+from datetime import datetime
+from typing import Dict, Optional, Union
+import time
+import os
+
+# Polls the analyze operation early (small contracts are often done before the
+# SDK default first poll) then backs off exponentially, up to a cap that grows
+# with the number of pages of the document when it is known.
+class AdaptiveAnalyzePolling(AsyncLROBasePolling):
+    def __init__(self, first_delay:float, growth:float, max_delay:float, **kwargs):
+        super().__init__(timeout=first_delay, **kwargs)
+        self.first_delay = first_delay
+        self.growth = growth
+        self.max_delay = max_delay
+        self.polls = 0
+
+    def _extract_delay(self) -> float:
+        # The Retry-After of the operation is ignored on purpose, throttled
+        # polls are still retried by the retry policy of the client
+        delay = min(self.max_delay, self.first_delay * (self.growth ** self.polls))
+        self.polls += 1
+        return delay
+
+class PollingStrategy:
+    def __init__(self,
+                 mode:str="adaptive",
+                 first_delay:float=0.5,
+                 growth:float=1.5,
+                 max_delay:float=5,
+                 delay_per_page:float=0.25,
+                 deadline:Optional[float]=None,
+                 background_deadline:Optional[float]=None):
+        if mode not in ("default", "adaptive"):
+            raise ValueError(f"Unknown polling strategy: {mode}")
+        self.mode = mode
+        self.first_delay = first_delay
+        self.growth = growth
+        self.max_delay = max_delay
+        self.delay_per_page = delay_per_page
+        # The skill answers within its timeout, the queue and the push
+        # indexing have their own deadline (or none)
+        self.deadline = deadline
+        self.background_deadline = background_deadline
+
+    def polling_method(self, endpoint:str, pages:Optional[int]=None) -> Union[bool, AsyncPollingMethod]:
+        if self.mode == "default":
+            return True
+
+        max_delay = self.max_delay
+        if pages:
+            max_delay = min(self.max_delay, max(self.first_delay, pages * self.delay_per_page))
+
+        return AdaptiveAnalyzePolling(
+            first_delay=self.first_delay,
+            growth=self.growth,
+            max_delay=max_delay,
+            path_format_arguments={"endpoint": endpoint}
+        )
+
+# Splits the latency of the analyze operations between the time spent by the
+# service analyzing the document and the overhead added by polling
+class PollingMetrics:
+    def __init__(self):
+        self.operations = 0
+        self.polls = 0
+        self.total_seconds = 0.0
+        self.analysis_seconds = 0.0
+
+    def record(self, poller:AsyncLROPoller, started_at:float):
+        elapsed = time.perf_counter() - started_at
+        polling_method = poller.polling_method()
+
+        self.operations += 1
+        self.total_seconds += elapsed
+        self.polls += getattr(polling_method, "polls", 0)
+
+        analysis = self._analysis_seconds(polling_method)
+        self.analysis_seconds += analysis if analysis is not None else elapsed
+
+    def _analysis_seconds(self, polling_method:AsyncPollingMethod) -> Optional[float]:
+        try:
+            status = polling_method._pipeline_response.http_response.json()
+            created = datetime.fromisoformat(status["createdDateTime"])
+            last_updated = datetime.fromisoformat(status["lastUpdatedDateTime"])
+            return (last_updated - created).total_seconds()
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
+
+    def stats(self) -> Dict[str, float]:
+        operations = self.operations or 1
+        return {
+            "operations": self.operations,
+            "polls": self.polls,
+            "avg_seconds": round(self.total_seconds / operations, 3),
+            "avg_analysis_seconds": round(self.analysis_seconds / operations, 3),
+            "avg_polling_overhead_seconds": round(max(0.0, self.total_seconds - self.analysis_seconds) / operations, 3)
+        }
+
+def create_polling_strategy() -> PollingStrategy:
+    deadline = float(os.getenv('DOC_ANALYZE_TIMEOUT', '25'))
+    background_deadline = float(os.getenv('DOC_ANALYZE_BACKGROUND_TIMEOUT', '0'))
+
+    return PollingStrategy(
+        mode=os.getenv('DOC_POLLING_STRATEGY', 'adaptive').lower(),
+        first_delay=float(os.getenv('DOC_POLL_FIRST_DELAY', '0.5')),
+        growth=float(os.getenv('DOC_POLL_GROWTH', '1.5')),
+        max_delay=float(os.getenv('DOC_POLL_MAX_DELAY', '5')),
+        delay_per_page=float(os.getenv('DOC_POLL_DELAY_PER_PAGE', '0.25')),
+        deadline=deadline if deadline > 0 else None,
+        background_deadline=background_deadline if background_deadline > 0 else None
+    )
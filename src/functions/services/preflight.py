@@ -0,0 +1,129 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import io
+import logging
+import os
+
+if TYPE_CHECKING:
+    from azure.storage.blob import BlobProperties
+    from azure.storage.blob.aio import BlobClient
+
+PDF_MAGIC = b"%PDF-"
+GENERIC_CONTENT_TYPES = ("", "application/octet-stream", "binary/octet-stream")
+
+# Raised for a blob not sent to Document Intelligence. With `warning` the
+# record is answered with empty fields and a warning (the indexer indexes the
+# blob without the fields), otherwise with an error.
+class PreflightRejected(Exception):
+
+    def __init__(self, reason:str, message:str, warning:bool=True):
+        super().__init__(message)
+        self.reason = reason
+        self.warning = warning
+
+# Cheap checks of a blob before the billable analysis: the blob properties
+# (size, content type), then range reads of its first and last bytes (PDF
+# signature, page count). With keywords, the text of the first pages must
+# contain one of them (scanned documents without text pass).
+class Preflight:
+
+    def __init__(self,
+                 content_types:Optional[List[str]]=None,
+                 min_bytes:int=1,
+                 max_bytes:int=500 * 1024 * 1024,
+                 max_pages:int=2000,
+                 probe_bytes:int=64 * 1024,
+                 keywords:Optional[List[str]]=None,
+                 keyword_pages:int=2,
+                 keyword_max_bytes:int=20 * 1024 * 1024,
+                 warning:bool=True):
+        self.content_types = [content_type.lower() for content_type in (content_types or ["application/pdf"])]
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.probe_bytes = probe_bytes
+        self.keywords = [keyword.lower() for keyword in (keywords or [])]
+        self.keyword_pages = keyword_pages
+        self.keyword_max_bytes = keyword_max_bytes
+        self.warning = warning
+        self.passed = 0
+        self.rejected:Dict[str, int] = {}
+
+    async def check(self, blob:"BlobClient", properties:"BlobProperties"):
+        try:
+            await self._check(blob, properties)
+        except PreflightRejected as ex:
+            self.rejected[ex.reason] = self.rejected.get(ex.reason, 0) + 1
+            logging.info(f"{blob.blob_name} not analyzed: {ex}")
+            raise
+        self.passed += 1
+
+    async def _check(self, blob:"BlobClient", properties:"BlobProperties"):
+        # Lazily imported, function_app imports this module at startup
+        from services.page_splitter import blob_page_count, read_blob_range
+
+        size = properties.size or 0
+        if size < self.min_bytes:
+            self._reject("empty", f"{blob.blob_name} is empty ({size} bytes), it was not analyzed")
+        if size > self.max_bytes:
+            self._reject("too_large", f"{blob.blob_name} is larger than {self.max_bytes} bytes, it was not analyzed")
+
+        content_type = (properties.content_settings.content_type or "").split(";")[0].strip().lower()
+        if content_type not in GENERIC_CONTENT_TYPES and content_type not in self.content_types:
+            self._reject("content_type", f"{blob.blob_name} is not a contract ({content_type}), it was not analyzed")
+
+        # The whole blob when small, else its first bytes
+        head = await read_blob_range(blob, 0, min(size, self.probe_bytes))
+        if PDF_MAGIC not in head[:1024]:
+            self._reject("not_pdf", f"{blob.blob_name} is not a PDF, it was not analyzed")
+
+        content = head if len(head) >= size else None
+        pages = await blob_page_count(blob, size, self.probe_bytes, head)
+        if pages and pages > self.max_pages:
+            self._reject("too_many_pages", f"{blob.blob_name} has {pages} pages, over the {self.max_pages} pages analyzed")
+
+        if self.keywords:
+            await self._check_keywords(blob, size, content)
+
+    async def _check_keywords(self, blob:"BlobClient", size:int, content:Optional[bytes]):
+        from services.page_splitter import PdfReader, read_blob_range
+
+        if size > self.keyword_max_bytes:
+            return
+        if content is None:
+            content = await read_blob_range(blob, 0, size)
+
+        try:
+            reader = PdfReader(io.BytesIO(content))
+            text = " ".join(page.extract_text() or "" for page in reader.pages[:self.keyword_pages]).lower()
+        except Exception:
+            # Left to Document Intelligence
+            return
+
+        if text.strip() and not any(keyword in text for keyword in self.keywords):
+            self._reject("no_keyword", f"{blob.blob_name} does not look like a contract, it was not analyzed")
+
+    def _reject(self, reason:str, message:str):
+        raise PreflightRejected(reason, message, self.warning)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "passed": self.passed,
+            "rejected": dict(self.rejected)
+        }
+
+def create_preflight() -> Optional[Preflight]:
+    if os.getenv('DOC_PREFLIGHT', 'false').lower() in ('false', '0', 'none'):
+        return None
+
+    action = os.getenv('DOC_PREFLIGHT_ACTION', 'warning').lower()
+    if action not in ('warning', 'error'):
+        raise ValueError(f"Unknown DOC_PREFLIGHT_ACTION value: {action}")
+
+    keywords = os.getenv('DOC_PREFLIGHT_KEYWORDS', '')
+    return Preflight(
+        content_types=os.getenv('DOC_PREFLIGHT_CONTENT_TYPES', 'application/pdf').split(','),
+        max_bytes=int(os.getenv('DOC_PREFLIGHT_MAX_BYTES', str(500 * 1024 * 1024))),
+        max_pages=int(os.getenv('DOC_PREFLIGHT_MAX_PAGES', '2000')),
+        keywords=[keyword.strip() for keyword in keywords.split(',') if keyword.strip()],
+        warning=action == 'warning'
+    )
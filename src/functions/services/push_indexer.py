@@ -0,0 +1,186 @@
+"""Push-mode indexing of the contracts, without the pull indexer and skillset.
+
+Lists the contracts container, analyzes the new or modified contracts with
+``ContractService`` and merges or uploads the fields to the index in batches
+(see ``services/index_writer.py``). The contracts deleted since the last run
+are removed from the index (see ``services/change_manifest.py``).
+
+Run from ``src/functions`` for a backfill::
+
+    python -m services.push_indexer --prefix contract_ --concurrency 32
+"""
+from services.contract_service import ContractService
+from services.change_manifest import ChangeManifest, create_change_manifest
+from services.index_writer import ACTION_FIELD, IndexWriter, create_index_writer
+from services.preflight import PreflightRejected
+from models import ContractFields
+from typing import Any, Dict, Optional, Set
+from urllib.parse import quote
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import time
+
+# Key of the index document of a blob, the same as the pull indexer: its
+# metadata_storage_path (the blob URL) in URL-safe base64 without padding, see
+# the fieldMappings of indexer.json. Both modes can fill the same index.
+def document_key(blob_url:str) -> str:
+    return base64.urlsafe_b64encode(blob_url.encode('utf-8')).decode('ascii').rstrip('=')
+
+def contract_key(contract_service:ContractService, file_name:str) -> str:
+    container_url = contract_service.clients.get_container_client(contract_service.container_name).url
+    return document_key(f"{container_url.rstrip('/')}/{quote(file_name, safe='~/')}")
+
+def index_document(key:str, contract_fields:ContractFields) -> Dict[str, Any]:
+    document = contract_fields.model_dump(mode='json', by_alias=True)
+    document["id"] = key
+    return document
+
+class PushIndexer:
+
+    def __init__(self,
+                 contract_service:ContractService,
+                 writer:IndexWriter,
+                 manifest:Optional[ChangeManifest]=None,
+                 concurrency:int=16):
+        self.contract_service = contract_service
+        self.writer = writer
+        self.manifest = manifest
+        self.concurrency = concurrency
+        self.listed = 0
+        self.analyzed = 0
+        self.failed = 0
+        self.skipped = 0
+        # ETag of the blobs being analyzed or indexed, committed to the
+        # manifest once their document is indexed
+        self._pending:Dict[str, str] = {}
+        # Blob of the documents sent to the index, by key
+        self._file_names:Dict[str, str] = {}
+        self.writer.on_indexed = self._indexed
+
+    async def run(self, prefix:Optional[str]=None) -> Dict[str, Any]:
+        started_at = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending:Set[asyncio.Task] = set()
+
+        if self.manifest:
+            await self.manifest.load()
+
+        try:
+            listed_names:Set[str] = set()
+            container = self.contract_service.clients.get_container_client(self.contract_service.container_name)
+            async for blob in container.list_blobs(name_starts_with=prefix):
+                self.listed += 1
+                listed_names.add(blob.name)
+                if self.manifest and not self.manifest.is_changed(blob.name, blob.etag):
+                    continue
+
+                self._pending[blob.name] = blob.etag
+                pending.add(asyncio.create_task(self._index(blob.name, semaphore)))
+                # Bounds the tasks of a large container, the listing waits for
+                # the analyses
+                if len(pending) >= self.concurrency * 2:
+                    _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            if pending:
+                await asyncio.wait(pending)
+
+            # The blobs deleted (or soft deleted) since the last run, under the
+            # prefix listed
+            if self.manifest:
+                for name in [name for name in self.manifest.entries if name.startswith(prefix or "") and name not in listed_names]:
+                    await self.writer.delete(self._key(name))
+        finally:
+            # Also saves the progress of an interrupted run, the next one
+            # resumes from it
+            await self.writer.flush()
+            if self.manifest:
+                await self.manifest.checkpoint(force=True)
+
+        return self.stats(time.perf_counter() - started_at)
+
+    async def _index(self, file_name:str, semaphore:asyncio.Semaphore):
+        try:
+            contract_fields = await self.contract_service.analyze_contract(file_name=file_name, semaphore=semaphore, background=True)
+        except PreflightRejected:
+            # Not a contract, not checked again until it is modified
+            self.skipped += 1
+            etag = self._pending.pop(file_name, None)
+            if self.manifest and etag:
+                self.manifest.commit(file_name, etag)
+            return
+        except Exception:
+            # Logged by the service, the next run analyzes it again
+            self.failed += 1
+            self._pending.pop(file_name, None)
+            return
+
+        self.analyzed += 1
+        await self.writer.add(index_document(self._key(file_name), contract_fields))
+        if self.manifest:
+            await self.manifest.checkpoint()
+
+    def _key(self, file_name:str) -> str:
+        key = contract_key(self.contract_service, file_name)
+        self._file_names[key] = file_name
+        return key
+
+    def _indexed(self, document:Dict[str, Any]):
+        file_name = self._file_names.pop(document["id"], None)
+        if not self.manifest or file_name is None:
+            return
+
+        if document.get(ACTION_FIELD) == "delete":
+            self.manifest.remove(file_name)
+            return
+
+        etag = self._pending.pop(file_name, None)
+        if etag:
+            self.manifest.commit(file_name, etag)
+
+    def stats(self, seconds:Optional[float]=None) -> Dict[str, Any]:
+        stats = {
+            "listed": self.listed,
+            "analyzed": self.analyzed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "index": self.writer.stats()
+        }
+        if self.manifest:
+            stats["manifest"] = self.manifest.stats()
+        if seconds is not None:
+            stats["seconds"] = round(seconds, 3)
+            stats["docs_per_second"] = round(self.analyzed / seconds, 2) if seconds else 0
+        return stats
+
+async def push_contracts(prefix:Optional[str]=None,
+                         concurrency:Optional[int]=None,
+                         contract_service:Optional[ContractService]=None) -> Dict[str, Any]:
+    owns_service = contract_service is None
+    contract_service = contract_service or ContractService()
+    writer = create_index_writer(contract_service.clients)
+    indexer = PushIndexer(contract_service, writer,
+                          manifest=create_change_manifest(contract_service.clients),
+                          concurrency=concurrency or int(os.getenv('PUSH_CONCURRENCY', '16')))
+    try:
+        return await indexer.run(prefix)
+    finally:
+        await writer.close()
+        if owns_service:
+            await contract_service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prefix", help="Only index the blobs whose name starts with this prefix")
+    parser.add_argument("--concurrency", type=int, help="Contracts analyzed at the same time (PUSH_CONCURRENCY)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    stats = asyncio.run(push_contracts(args.prefix, args.concurrency))
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+from azure.core.pipeline import PipelineRequest, PipelineResponse
+from azure.core.pipeline.policies import SansIOHTTPPolicy
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional
+import asyncio
+import logging
+import time
+import os
+
+# Adaptive limit (AIMD) on the analyze operations in flight in the worker.
+# Every successful operation grows the limit by `increase` per window of
+# `limit` operations, a throttled one (429) multiplies it by `decrease_factor`
+# and pauses new operations for the Retry-After delay. An optional token bucket
+# caps the rate at which new operations are submitted.
+class AdaptiveRateLimiter:
+    def __init__(self,
+                 initial_limit:float=4,
+                 min_limit:float=1,
+                 max_limit:float=32,
+                 increase:float=1,
+                 decrease_factor:float=0.5,
+                 requests_per_second:Optional[float]=None,
+                 default_retry_after:float=1):
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.requests_per_second = requests_per_second
+        self.default_retry_after = default_retry_after
+        self.in_flight = 0
+        self.throttled = 0
+
+        self._condition = asyncio.Condition()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._tokens = float(requests_per_second or 0)
+        self._last_refill = time.monotonic()
+
+    def _bucket_delay(self, now:float) -> float:
+        if not self.requests_per_second:
+            return 0
+
+        # The bucket holds at most one second of requests
+        self._tokens = min(self.requests_per_second,
+                           self._tokens + (now - self._last_refill) * self.requests_per_second)
+        self._last_refill = now
+
+        if self._tokens >= 1:
+            return 0
+        return (1 - self._tokens) / self.requests_per_second
+
+    @property
+    def saturated(self) -> bool:
+        # A new operation would wait for a slot
+        return time.monotonic() < self._paused_until or self.in_flight >= max(1, int(self.limit))
+
+    async def acquire(self):
+        async with self._condition:
+            while True:
+                now = time.monotonic()
+                delay = self._paused_until - now
+
+                if delay <= 0 and self.in_flight < max(1, int(self.limit)):
+                    delay = self._bucket_delay(now)
+                    if delay <= 0:
+                        if self.requests_per_second:
+                            self._tokens -= 1
+                        self.in_flight += 1
+                        return
+
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await self._condition.wait()
+
+    async def release(self, succeeded:bool):
+        async with self._condition:
+            self.in_flight -= 1
+            if succeeded:
+                self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+            self._condition.notify_all()
+
+    def on_throttled(self, retry_after:Optional[float]):
+        now = time.monotonic()
+        self.throttled += 1
+        self._paused_until = max(self._paused_until, now + (retry_after or self.default_retry_after))
+
+        # A burst of 429 for operations started with the same limit only
+        # shrinks it once
+        if now - self._last_decrease >= (retry_after or self.default_retry_after):
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            self._last_decrease = now
+            logging.warning(f"Document Intelligence throttled the requests, in-flight limit reduced to {int(self.limit)}")
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        succeeded = False
+        try:
+            yield
+            succeeded = True
+        finally:
+            await self.release(succeeded)
+
+# Reports every throttled response (including the ones retried by the SDK) to
+# the limiter, add it to the per retry policies of the client
+class ThrottlingFeedbackPolicy(SansIOHTTPPolicy):
+    def __init__(self, rate_limiter:AdaptiveRateLimiter):
+        self.rate_limiter = rate_limiter
+
+    def on_response(self, request:PipelineRequest, response:PipelineResponse):
+        if response.http_response.status_code == 429:
+            self.rate_limiter.on_throttled(get_retry_after(response))
+
+def get_retry_after(response:PipelineResponse) -> Optional[float]:
+    headers = response.http_response.headers
+
+    retry_after_ms = headers.get("retry-after-ms") or headers.get("x-ms-retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("Retry-After")
+    if not retry_after:
+        return None
+
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+
+    # Retry-After can also be an HTTP date
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def create_rate_limiter() -> Optional[AdaptiveRateLimiter]:
+    max_in_flight = int(os.getenv('DOC_MAX_IN_FLIGHT', '32'))
+    if max_in_flight <= 0:
+        return None
+
+    requests_per_second = float(os.getenv('DOC_REQUESTS_PER_SECOND', '0'))
+
+    return AdaptiveRateLimiter(
+        initial_limit=min(max_in_flight, int(os.getenv('DOC_INITIAL_IN_FLIGHT', '4'))),
+        min_limit=int(os.getenv('DOC_MIN_IN_FLIGHT', '1')),
+        max_limit=max_in_flight,
+        requests_per_second=requests_per_second or None
+    )
@@ -0,0 +1,133 @@
+"""Extracts the fields again from the archived analyze results.
+
+Replays the raw analyze results stored by ``ANALYZE_ARCHIVE`` (see
+``services/result_archive.py``) through the current extraction, across a
+process pool and without any Document Intelligence call, after a change of
+``ContractFields`` or of the extraction. The fields are written to a JSONL
+file and, optionally, to the result cache (under the current
+``extraction_version``) and pushed to the index (the last analysis of each
+contract only).
+
+Run from ``src/functions`` with the ``ANALYZE_ARCHIVE`` settings::
+
+    python -m services.reextract --output fields.jsonl --workers 8 --cache --push
+"""
+from concurrent.futures import ProcessPoolExecutor
+from services.client_factory import ClientFactory
+from services.contract_service import ContractService
+from services.result_archive import create_result_archive, load_entry
+from models import ContractFields
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+
+def extract_entry(data:bytes) -> Tuple[Dict[str, Any], Optional[str], Optional[str]]:
+    # Runs in the workers: the archive entry and its fields (JSON) or error
+    entry = load_entry(data)
+    summary = {key: entry[key] for key in ("file_name", "etag", "content_version", "model_id")}
+    try:
+        contract_fields = ContractService.extract_results(entry["results"])
+    except Exception as ex:
+        return summary, None, f"{type(ex).__name__}: {ex}"
+    return summary, contract_fields.stored_json(), None
+
+async def reextract(output:Optional[str]=None,
+                    workers:Optional[int]=None,
+                    chunk_size:int=64,
+                    cache:bool=False,
+                    push:bool=False) -> Dict[str, Any]:
+    started_at = time.perf_counter()
+    clients = ClientFactory()
+    archive = create_result_archive(clients)
+    if archive is None:
+        await clients.close()
+        raise ValueError("ANALYZE_ARCHIVE is not set, there is no archive to read")
+
+    # Owns the clients, the archive and the result cache
+    service = ContractService(clients=clients, archive=archive)
+    if cache and not service.cache:
+        await service.close()
+        raise ValueError("--cache requires a result cache (RESULT_CACHE)")
+
+    writer = None
+    if push:
+        from services.index_writer import create_index_writer
+        from services.push_indexer import contract_key, index_document
+        writer = create_index_writer(clients)
+
+    entries = [entry async for entry in archive.list()]
+    archived = len(entries)
+    if push:
+        # Only the last analysis of a contract is pushed to the index
+        latest:Dict[str, Tuple[str, float]] = {}
+        for name, archived_at in entries:
+            file_name = name.rsplit('/', 1)[0]
+            if file_name not in latest or archived_at > latest[file_name][1]:
+                latest[file_name] = (name, archived_at)
+        entries = list(latest.values())
+    names = [name for name, _ in entries]
+
+    extracted = 0
+    errors = 0
+    loop = asyncio.get_running_loop()
+    out = open(output, 'w', encoding='utf-8') if output else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Read by chunks, only a chunk of the archive is in memory
+            for start in range(0, len(names), chunk_size):
+                chunk:List[bytes] = [data for data in await asyncio.gather(*[archive.read(name) for name in names[start:start + chunk_size]]) if data]
+                results = await asyncio.gather(*[loop.run_in_executor(executor, extract_entry, data) for data in chunk])
+
+                for summary, fields_json, error in results:
+                    if error:
+                        errors += 1
+                        logging.error(f"The fields of {summary['file_name']} could not be extracted: {error}")
+                        continue
+
+                    extracted += 1
+                    if out:
+                        out.write(json.dumps({**summary, "fields": json.loads(fields_json)}) + "\n")
+                    if cache or writer:
+                        contract_fields = ContractFields.model_validate_json(fields_json)
+                    if cache:
+                        await service.cache.set(service.result_key(summary['file_name'], summary['content_version']), contract_fields)
+                    if writer:
+                        await writer.add(index_document(contract_key(service, summary['file_name']), contract_fields))
+    finally:
+        if out:
+            out.close()
+        if writer:
+            await writer.close()
+        await service.close()
+
+    elapsed = time.perf_counter() - started_at
+    stats = {
+        "archived": archived,
+        "extracted": extracted,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "docs_per_second": round(extracted / elapsed, 2) if elapsed else 0
+    }
+    if writer:
+        stats["index"] = writer.stats()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="JSONL file of the extracted fields")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes of the extraction")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Archived results read at a time")
+    parser.add_argument("--cache", action="store_true", help="Store the fields in the result cache (RESULT_CACHE)")
+    parser.add_argument("--push", action="store_true", help="Push the fields to the index (INDEX_TARGET)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    stats = asyncio.run(reextract(args.output, args.workers, args.chunk_size, args.cache, args.push))
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
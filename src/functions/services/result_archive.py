@@ -0,0 +1,135 @@
+from azure.core.exceptions import ResourceNotFoundError
+from services.client_factory import ClientFactory
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import gzip
+import json
+import os
+
+# Archive of the raw analyze results (every range of a split contract), gzip
+# compressed JSON keyed by blob name and ETag. The fields can then be
+# extracted again without Document Intelligence when the extraction or the
+# models change, see services/reextract.py.
+class ResultArchive(ABC):
+
+    def __init__(self):
+        self.stored = 0
+        self.stored_bytes = 0
+
+    async def put(self, file_name:str, etag:str, content_version:str, model_id:str, results:List[Dict[str, Any]]):
+        # content_version is the version of the result cache key (MD5 or ETag).
+        # Serialized and compressed in a thread, not on the event loop.
+        data = await asyncio.to_thread(self._encode, {
+            "file_name": file_name,
+            "etag": etag,
+            "content_version": content_version,
+            "model_id": model_id,
+            "results": results
+        })
+        await self._write(archive_name(file_name, etag), data)
+        self.stored += 1
+        self.stored_bytes += len(data)
+
+    @staticmethod
+    def _encode(entry:Dict[str, Any]) -> bytes:
+        return gzip.compress(json.dumps(entry, separators=(',', ':')).encode('utf-8'))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "stored": self.stored,
+            "stored_bytes": self.stored_bytes
+        }
+
+    @abstractmethod
+    def list(self) -> AsyncIterator[Tuple[str, float]]:
+        # Name and archive time (timestamp) of every entry
+        ...
+
+    @abstractmethod
+    async def read(self, name:str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def _write(self, name:str, data:bytes):
+        ...
+
+    async def close(self):
+        pass
+
+def archive_name(file_name:str, etag:str) -> str:
+    # Without the quotes of the ETag
+    version = etag.strip('"')
+    return f"{file_name}/{version}.json.gz"
+
+def load_entry(data:bytes) -> Dict[str, Any]:
+    return json.loads(gzip.decompress(data))
+
+class FileResultArchive(ResultArchive):
+    def __init__(self, path:str):
+        super().__init__()
+        self.path = path
+
+    def _write_file(self, name:str, data:bytes):
+        path = os.path.join(self.path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", 'wb') as file:
+            file.write(data)
+        os.replace(f"{path}.tmp", path)
+
+    def _read_file(self, name:str) -> Optional[bytes]:
+        path = os.path.join(self.path, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as file:
+            return file.read()
+
+    async def _write(self, name:str, data:bytes):
+        await asyncio.to_thread(self._write_file, name, data)
+
+    async def read(self, name:str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read_file, name)
+
+    async def list(self) -> AsyncIterator[Tuple[str, float]]:
+        for directory, _, files in os.walk(self.path):
+            for file in files:
+                if file.endswith(".json.gz"):
+                    path = os.path.join(directory, file)
+                    yield os.path.relpath(path, self.path).replace(os.sep, '/'), os.path.getmtime(path)
+
+# In a container of the storage account, or of Azurite with BLOB_CONNECTION_STRING
+class BlobResultArchive(ResultArchive):
+    def __init__(self, clients:ClientFactory, container_name:str):
+        super().__init__()
+        self.clients = clients
+        self.container_name = container_name
+
+    async def _write(self, name:str, data:bytes):
+        container_client = await self.clients.get_created_container_client(self.container_name)
+        await container_client.upload_blob(name, data, overwrite=True)
+
+    async def read(self, name:str) -> Optional[bytes]:
+        try:
+            downloader = await self.clients.get_container_client(self.container_name).download_blob(name)
+        except ResourceNotFoundError:
+            return None
+        return await downloader.readall()
+
+    async def list(self) -> AsyncIterator[Tuple[str, float]]:
+        async for blob in self.clients.get_container_client(self.container_name).list_blobs():
+            if blob.name.endswith(".json.gz"):
+                yield blob.name, blob.last_modified.timestamp()
+
+def create_result_archive(clients:ClientFactory) -> Optional[ResultArchive]:
+    archive_type = os.getenv('ANALYZE_ARCHIVE', 'none').lower()
+
+    if archive_type == 'file':
+        return FileResultArchive(os.getenv('ANALYZE_ARCHIVE_PATH', 'analyze_results'))
+
+    if archive_type == 'blob':
+        return BlobResultArchive(clients, os.getenv('ANALYZE_ARCHIVE_CONTAINER', 'analyze-results'))
+
+    if archive_type != 'none':
+        raise ValueError(f"Unknown ANALYZE_ARCHIVE value: {archive_type}")
+
+    return None
@@ -0,0 +1,209 @@
+from azure.core.exceptions import ResourceNotFoundError
+from services.client_factory import ClientFactory
+from models import ContractFields
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import os
+
+# Cache of the fields extracted from a contract. The key identifies the content
+# of the blob (ETag or MD5) and the model used, so an unchanged contract is
+# never sent twice to Document Intelligence.
+class ResultCache(ABC):
+    def __init__(self, ttl_seconds:Optional[float]=None):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key:str) -> Optional[ContractFields]:
+        value = await self._get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return ContractFields.model_validate_json(value)
+
+    async def set(self, key:str, contract_fields:ContractFields):
+        await self._set(key, contract_fields.stored_json())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def _expires_at(self) -> Optional[float]:
+        if self.ttl_seconds is None:
+            return None
+        return time.time() + self.ttl_seconds
+
+    @abstractmethod
+    async def _get(self, key:str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def _set(self, key:str, value:str):
+        ...
+
+    async def close(self):
+        pass
+
+class MemoryResultCache(ResultCache):
+    def __init__(self, max_entries:int=10000, ttl_seconds:Optional[float]=None):
+        super().__init__(ttl_seconds)
+        self.max_entries = max_entries
+        self._entries:OrderedDict[str, Tuple[Optional[float], str]] = OrderedDict()
+
+    async def _get(self, key:str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.time():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def _set(self, key:str, value:str):
+        self._entries[key] = (self._expires_at(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        stats = super().stats()
+        stats["size"] = len(self._entries)
+        return stats
+
+# Local stand-in for a shared store (Table Storage, Redis...), the results
+# survive a restart of the worker
+class SqliteResultCache(ResultCache):
+    def __init__(self, path:str, ttl_seconds:Optional[float]=None):
+        super().__init__(ttl_seconds)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, expires_at REAL, value TEXT NOT NULL)"
+        )
+        self._connection.commit()
+        # Kept up to date by the writes, stats() is logged by every request
+        self._size = self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def _read(self, key:str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT expires_at, value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            expires_at, value = row
+            if expires_at is not None and expires_at < time.time():
+                self._connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._connection.commit()
+                self._size -= 1
+                return None
+
+            return value
+
+    def _write(self, key:str, value:str):
+        with self._lock:
+            exists = self._connection.execute("SELECT 1 FROM results WHERE key = ?", (key,)).fetchone() is not None
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, expires_at, value) VALUES (?, ?, ?)",
+                (key, self._expires_at(), value)
+            )
+            self._connection.commit()
+            if not exists:
+                self._size += 1
+
+    async def _get(self, key:str) -> Optional[str]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def _set(self, key:str, value:str):
+        await asyncio.to_thread(self._write, key, value)
+
+    def stats(self) -> Dict[str, int]:
+        stats = super().stats()
+        stats["size"] = self._size
+        return stats
+
+    async def close(self):
+        with self._lock:
+            self._connection.close()
+
+# Shared by every instance of the function app, this is the results store of
+# the queue-backed skill mode
+class BlobResultCache(ResultCache):
+    def __init__(self, clients:ClientFactory, container_name:str, ttl_seconds:Optional[float]=None):
+        super().__init__(ttl_seconds)
+        self.clients = clients
+        self.container_name = container_name
+
+    def _blob_name(self, key:str) -> str:
+        return f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json"
+
+    async def _get(self, key:str) -> Optional[str]:
+        try:
+            downloader = await self.clients.get_container_client(self.container_name).download_blob(self._blob_name(key), encoding='utf-8')
+        except ResourceNotFoundError:
+            return None
+
+        expires_at = downloader.properties.metadata.get('expires_at')
+        if expires_at and float(expires_at) < time.time():
+            return None
+
+        return await downloader.readall()
+
+    async def _set(self, key:str, value:str):
+        container_client = await self.clients.get_created_container_client(self.container_name)
+        expires_at = self._expires_at()
+        metadata = {'expires_at': str(expires_at)} if expires_at is not None else None
+
+        await container_client.upload_blob(
+            self._blob_name(key),
+            value.encode('utf-8'),
+            overwrite=True,
+            metadata=metadata
+        )
+
+def create_result_cache(clients:ClientFactory) -> Optional[ResultCache]:
+    cache_type = os.getenv('RESULT_CACHE', 'none').lower()
+    ttl = os.getenv('RESULT_CACHE_TTL')
+    ttl_seconds = float(ttl) if ttl else None
+
+    if cache_type == 'memory':
+        return MemoryResultCache(
+            max_entries=int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '10000')),
+            ttl_seconds=ttl_seconds
+        )
+
+    if cache_type == 'sqlite':
+        return SqliteResultCache(
+            path=os.getenv('RESULT_CACHE_PATH', 'result_cache.db'),
+            ttl_seconds=ttl_seconds
+        )
+
+    if cache_type == 'blob':
+        return BlobResultCache(
+            clients=clients,
+            container_name=os.getenv('RESULT_CACHE_CONTAINER', 'results'),
+            ttl_seconds=ttl_seconds
+        )
+
+    if cache_type != 'none':
+        raise ValueError(f"Unknown RESULT_CACHE value: {cache_type}")
+
+    return None
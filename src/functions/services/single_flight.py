@@ -0,0 +1,58 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+import asyncio
+import os
+
+T = TypeVar("T")
+
+# Merges the concurrent analyses of the same document into one operation: the
+# first caller starts it, the callers arriving while it is in flight await the
+# same future. The key is the blob name (mode "name") or, when known, the MD5
+# of the content so copies of a blob under other names are merged too (mode
+# "content"). Nothing is kept once the operation completes, the result cache
+# covers the later calls.
+class SingleFlight:
+
+    def __init__(self, mode:str="name"):
+        if mode not in ("name", "content"):
+            raise ValueError(f"Unknown DOC_DEDUPLICATE value: {mode}")
+        self.mode = mode
+        self.started = 0
+        self.shared = 0
+        self._calls:Dict[str, asyncio.Task] = {}
+
+    async def do(self, key:str, call:Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        # Returns the result and whether it was shared with a call already in flight
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.shared += 1
+        else:
+            self.started += 1
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        # A cancelled caller (e.g. its skill request timed out) does not cancel
+        # the operation awaited by the others
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key:str, task:asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Retrieved here in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "started": self.started,
+            "shared": self.shared,
+            "in_flight": len(self._calls)
+        }
+
+def create_single_flight() -> Optional[SingleFlight]:
+    mode = os.getenv('DOC_DEDUPLICATE', 'name').lower()
+    if mode == 'none':
+        return None
+    return SingleFlight(mode)
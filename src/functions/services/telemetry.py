@@ -0,0 +1,156 @@
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, Deque, Dict, Iterator, Optional
+import logging
+import statistics
+import sys
+import time
+import os
+
+try:
+    from opentelemetry import metrics, trace
+except ImportError:
+    # The stage timings are still kept in memory and reported by stats()
+    metrics = None
+    trace = None
+
+SCOPE_NAME = "contract-skill"
+
+# Times the stages of the skill (request parsing, blob URL, token fetch,
+# analyze submit, polling, extraction, serialization...). Each stage is an
+# OpenTelemetry span and a sample of the contract_skill.stage.duration
+# histogram, exported to Application Insights or the console/file exporter
+# set up by configure_telemetry. The last samples of each stage are also kept
+# in memory for stats() and the benchmarks.
+class Telemetry:
+
+    def __init__(self, max_samples:int=2048):
+        self.max_samples = max_samples
+        self._samples:Dict[str, Deque[float]] = {}
+        self._counts:Dict[str, int] = {}
+
+        # The API tracer and meter are proxies bound to the providers set up
+        # later by configure_telemetry
+        self.tracer = trace.get_tracer(SCOPE_NAME) if trace else None
+        self.stage_duration = metrics.get_meter(SCOPE_NAME).create_histogram(
+            "contract_skill.stage.duration",
+            unit="ms",
+            description="Duration of the stages of the contract skill"
+        ) if metrics else None
+
+    @contextmanager
+    def stage(self, name:str, **attributes:Any) -> Iterator[None]:
+        # The attributes only go to the span, the histogram is only
+        # dimensioned by the stage to keep its cardinality low
+        span = self.tracer.start_as_current_span(
+            f"contract.{name}",
+            attributes={key: value for key, value in attributes.items() if value is not None}
+        ) if self.tracer else nullcontext()
+
+        started_at = time.perf_counter()
+        with span:
+            try:
+                yield
+            finally:
+                self.record(name, time.perf_counter() - started_at)
+
+    def record(self, name:str, seconds:float):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.max_samples)
+        samples.append(seconds)
+        self._counts[name] = self._counts.get(name, 0) + 1
+
+        if self.stage_duration is not None:
+            self.stage_duration.record(seconds * 1000, {"stage": name})
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        stats = {}
+        for name, samples in self._samples.items():
+            values = sorted(samples)
+            stats[name] = {
+                "count": self._counts[name],
+                "p50_ms": round(_percentile(values, 50) * 1000, 2),
+                "p95_ms": round(_percentile(values, 95) * 1000, 2),
+                "p99_ms": round(_percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2),
+            }
+        return stats
+
+def _percentile(values:list, percent:int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+# Times the token fetches of the credential shared by the Azure clients. The
+# SDK policies cache the tokens, so only the actual fetches and refreshes are
+# recorded.
+class TimedCredential:
+
+    def __init__(self, credential, telemetry:Telemetry):
+        self.credential = credential
+        self.telemetry = telemetry
+
+    async def get_token(self, *scopes:str, **kwargs):
+        with self.telemetry.stage("credential", scopes=",".join(scopes)):
+            return await self.credential.get_token(*scopes, **kwargs)
+
+    async def close(self):
+        await self.credential.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+telemetry = Telemetry()
+
+# TELEMETRY_EXPORTER selects where the spans and the histograms go:
+# azure_monitor (default when APPLICATIONINSIGHTS_CONNECTION_STRING is set),
+# console, file (TELEMETRY_FILE) or none
+def configure_telemetry(exporter:Optional[str]=None) -> str:
+    exporter = (exporter
+                or os.getenv('TELEMETRY_EXPORTER')
+                or ('azure_monitor' if os.getenv('APPLICATIONINSIGHTS_CONNECTION_STRING') else 'none')).lower()
+
+    if exporter == 'none':
+        return exporter
+
+    if trace is None:
+        logging.warning(f"TELEMETRY_EXPORTER {exporter} ignored, opentelemetry is not installed")
+        return 'none'
+
+    if exporter == 'azure_monitor':
+        from azure.monitor.opentelemetry import configure_azure_monitor
+        configure_azure_monitor(credential=_monitor_credential())
+    elif exporter in ('console', 'file'):
+        from opentelemetry.sdk.metrics import MeterProvider
+        from opentelemetry.sdk.metrics.export import ConsoleMetricExporter, PeriodicExportingMetricReader
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+        out = open(os.getenv('TELEMETRY_FILE', 'telemetry.jsonl'), 'a', encoding='utf-8') if exporter == 'file' else sys.stdout
+        tracer_provider = TracerProvider()
+        tracer_provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter(out=out)))
+        trace.set_tracer_provider(tracer_provider)
+        metrics.set_meter_provider(MeterProvider(metric_readers=[
+            PeriodicExportingMetricReader(ConsoleMetricExporter(out=out),
+                                          export_interval_millis=float(os.getenv('TELEMETRY_EXPORT_INTERVAL', '60')) * 1000)
+        ]))
+    else:
+        raise ValueError(f"Unknown TELEMETRY_EXPORTER: {exporter}")
+
+    return exporter
+
+def _monitor_credential():
+    # Application Insights with local authentication disabled, as deployed by
+    # infra/modules/functions.bicep (ClientId=...;Authorization=AAD)
+    authentication = dict(
+        part.split('=', 1) for part in os.getenv('APPLICATIONINSIGHTS_AUTHENTICATION_STRING', '').split(';') if '=' in part
+    )
+    if authentication.get('Authorization') != 'AAD':
+        return None
+
+    from azure.identity import ManagedIdentityCredential
+    return ManagedIdentityCredential(client_id=authentication.get('ClientId'))
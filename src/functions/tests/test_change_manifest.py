@@ -0,0 +1,78 @@
+from services.change_manifest import FileChangeManifest
+import asyncio
+import pytest
+
+def test_changes_are_detected_by_etag(tmp_path):
+    manifest = FileChangeManifest(str(tmp_path / "manifest.json"))
+    manifest.commit("a.pdf", "1")
+
+    assert manifest.is_changed("b.pdf", "1")
+    assert manifest.is_changed("a.pdf", "2")
+    assert not manifest.is_changed("a.pdf", "1")
+    assert (manifest.new, manifest.modified, manifest.unchanged) == (1, 1, 1)
+
+def test_checkpoint_appends_the_changes_since_the_last_one(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = FileChangeManifest(path, checkpoint_interval=2)
+
+    async def run():
+        manifest.commit("a.pdf", "1")
+        await manifest.checkpoint()
+        manifest.commit("b.pdf", "1")
+        await manifest.checkpoint()
+        manifest.commit("c.pdf", "1")
+        manifest.remove("a.pdf")
+        await manifest.checkpoint(force=True)
+
+    asyncio.run(run())
+    with open(f"{path}.log", encoding="utf-8") as log:
+        lines = log.read().splitlines()
+    # Only the changes, never the whole manifest
+    assert lines == ['["set","a.pdf","1"]', '["set","b.pdf","1"]', '["set","c.pdf","1"]', '["remove","a.pdf"]']
+    assert manifest.checkpoints == 2
+
+    loaded = FileChangeManifest(path)
+    asyncio.run(loaded.load())
+    assert loaded.entries == {"b.pdf": "1", "c.pdf": "1"}
+
+def test_interrupted_append_is_ignored(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    with open(f"{path}.log", "w", encoding="utf-8") as log:
+        log.write('["set","a.pdf","1"]\n["set","b.pd')
+
+    manifest = FileChangeManifest(path)
+    asyncio.run(manifest.load())
+    assert manifest.entries == {"a.pdf": "1"}
+
+def test_log_is_compacted_once_larger_than_the_snapshot(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = FileChangeManifest(path, checkpoint_interval=1)
+
+    async def run():
+        for etag in range(3):
+            manifest.commit("a.pdf", str(etag))
+            await manifest.checkpoint()
+
+    asyncio.run(run())
+
+    loaded = FileChangeManifest(path, checkpoint_interval=1)
+    asyncio.run(loaded.load())
+    assert loaded.entries == {"a.pdf": "2"}
+    assert loaded.stats()["compactions"] == 1
+    assert loaded.stats()["log_size"] == 0
+
+    reloaded = FileChangeManifest(path)
+    asyncio.run(reloaded.load())
+    assert reloaded.entries == {"a.pdf": "2"}
+
+def test_failed_checkpoint_keeps_the_changes(tmp_path):
+    manifest = FileChangeManifest(str(tmp_path / "missing" / "manifest.json"))
+    manifest.commit("a.pdf", "1")
+
+    with pytest.raises(OSError):
+        asyncio.run(manifest.checkpoint(force=True))
+
+    manifest.path = str(tmp_path / "manifest.json")
+    manifest.log_path = f"{manifest.path}.log"
+    asyncio.run(manifest.checkpoint(force=True))
+    assert manifest.checkpoints == 1
@@ -0,0 +1,89 @@
+from azure.core.exceptions import HttpResponseError
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+import asyncio
+import pytest
+
+def server_error() -> HttpResponseError:
+    error = HttpResponseError(message="Internal server error")
+    error.status_code = 500
+    return error
+
+def client_error() -> HttpResponseError:
+    error = HttpResponseError(message="Invalid PDF")
+    error.status_code = 400
+    return error
+
+def open_breaker(reset_timeout:float=0) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=reset_timeout)
+    for _ in range(2):
+        breaker.end_trial(breaker.check())
+        breaker.on_failure(server_error())
+    assert breaker.state == "open"
+    return breaker
+
+def test_opens_after_consecutive_service_failures():
+    breaker = open_breaker(reset_timeout=60)
+
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    assert breaker.stats()["rejected"] == 1
+
+def test_client_errors_do_not_open():
+    breaker = CircuitBreaker(failure_threshold=2)
+    for _ in range(5):
+        breaker.on_failure(client_error())
+
+    assert breaker.state == "closed"
+
+def test_half_open_success_closes():
+    breaker = open_breaker()
+
+    trial = breaker.check()
+    assert breaker.state == "half_open"
+    breaker.on_success()
+    breaker.end_trial(trial)
+
+    assert breaker.state == "closed"
+    assert breaker.check() is None
+
+def test_half_open_service_failure_opens_again():
+    breaker = open_breaker()
+
+    trial = breaker.check()
+    breaker.on_failure(server_error())
+    breaker.end_trial(trial)
+
+    assert breaker.state == "open"
+    assert breaker.stats()["opened"] == 2
+
+def test_half_open_only_lets_one_trial_through():
+    breaker = open_breaker()
+
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+@pytest.mark.parametrize("outcome", [client_error(), asyncio.CancelledError(), OSError("download failed")])
+def test_trial_without_verdict_releases_its_slot(outcome):
+    breaker = open_breaker()
+
+    trial = breaker.check()
+    # Neither a success nor a failure of the service
+    breaker.on_failure(outcome)
+    breaker.end_trial(trial)
+
+    assert breaker.state == "half_open"
+    assert breaker.check() is not None
+
+def test_late_end_trial_of_a_previous_half_open_state_is_ignored():
+    breaker = open_breaker()
+
+    first = breaker.check()
+    breaker.on_failure(server_error())
+    second = breaker.check()
+    breaker.end_trial(first)
+
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.end_trial(second)
+    assert breaker.check() is not None
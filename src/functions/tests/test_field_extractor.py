@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+from services.field_extractor import FieldExtractor, parse_date, parse_months
+from models import ContractFields
+import pytest
+
+@pytest.mark.parametrize("text, months", [
+    ("12 months", 12),
+    ("two (2) years", 24),
+    ("eighteen-month", 18),
+    ("twenty-four months", 24),
+    ("1 year and 6 months", 18),
+    ("1 year, 6 months", 18),
+    ("ninety (90) days", 2.96),
+    ("36 months, renewable for additional 12 month periods", 36),
+    ("three (3) years with automatic renewal for successive one-year terms", 36),
+    ("24 months, terminable on 30 days notice", 24),
+    ("the initial term of 6 months and thereafter 1 year renewals", 6),
+    ("perpetual", None),
+    ("", None),
+])
+def test_parse_months(text, months):
+    assert parse_months(text) == months
+
+@pytest.mark.parametrize("text", [
+    "August 19, 2025",
+    "Aug 19, 2025",
+    "19 August 2025",
+    "19th day of August, 2025",
+    "19 day of August, 2025",
+    "2025-08-19",
+    "08/19/2025",
+])
+def test_parse_date(text):
+    assert parse_date(text) == datetime(2025, 8, 19, tzinfo=timezone.utc)
+
+def test_parse_date_unknown_format():
+    assert parse_date("upon signature") is None
+
+def test_typed_fields_prefer_the_date_value():
+    extractor = FieldExtractor(ContractFields)
+    fields = extractor.extract({"fields": {
+        "ExpirationDate": {"valueDate": "2026-08-14", "content": "the fourteenth of August"},
+        "RenewalDate": {"content": "June 1st, 2026"},
+        "ContractDuration": {"valueString": "12 months, renewable for 12 month periods"},
+    }})
+
+    assert fields.expiration_date == "the fourteenth of August"
+    assert fields.expiration_date_value == datetime(2026, 8, 14, tzinfo=timezone.utc)
+    assert fields.renewal_date_value == datetime(2026, 6, 1, tzinfo=timezone.utc)
+    assert fields.contract_duration_months == 12
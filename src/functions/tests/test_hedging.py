@@ -0,0 +1,83 @@
+from services.hedging import HedgingPolicy
+import asyncio
+
+def warmed_policy(budget:float=1) -> HedgingPolicy:
+    policy = HedgingPolicy(percentile=50, min_delay=0.01, budget=budget, min_samples=2)
+    for _ in range(2):
+        policy.record(0.01)
+    return policy
+
+def test_not_hedged_before_min_samples():
+    policy = HedgingPolicy(min_samples=20)
+    assert policy.delay() is None
+
+def test_slow_operation_is_hedged_and_loser_cancelled():
+    policy = warmed_policy()
+    calls = []
+
+    async def call():
+        calls.append(asyncio.current_task())
+        # The first operation hangs, the hedge completes
+        await asyncio.sleep(10 if len(calls) == 1 else 0)
+        return len(calls)
+
+    async def run():
+        result = await policy.run(call)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == 2
+    assert policy.stats()["hedged"] == 1
+    assert policy.stats()["hedge_won"] == 1
+    assert calls[0].cancelled()
+
+def test_failure_waits_for_the_other_operation():
+    policy = warmed_policy()
+    calls = []
+
+    async def call():
+        calls.append(None)
+        if len(calls) == 1:
+            await asyncio.sleep(0.05)
+            raise TimeoutError()
+        await asyncio.sleep(0.1)
+        return "hedge"
+
+    assert asyncio.run(policy.run(call)) == "hedge"
+
+def test_budget_limits_the_hedges():
+    policy = warmed_policy(budget=0)
+    # The policy starts with one hedge available
+    policy._tokens = 0
+
+    async def call():
+        await asyncio.sleep(0.05)
+        return "first"
+
+    assert asyncio.run(policy.run(call)) == "first"
+    assert policy.stats()["hedged"] == 0
+    assert policy.stats()["over_budget"] == 1
+
+def test_not_hedged_while_saturated():
+    policy = warmed_policy()
+
+    async def call():
+        await asyncio.sleep(0.05)
+        return "first"
+
+    assert asyncio.run(policy.run(call, can_hedge=lambda: False)) == "first"
+    assert policy.stats()["hedged"] == 0
+    assert policy.stats()["saturated"] == 1
+
+def test_hedge_call_starts_the_second_operation():
+    policy = warmed_policy()
+
+    async def call():
+        await asyncio.sleep(10)
+        return "first"
+
+    async def hedge_call():
+        return "hedge"
+
+    assert asyncio.run(policy.run(call, hedge_call=hedge_call, can_hedge=lambda: True)) == "hedge"
+    assert policy.stats()["hedge_won"] == 1
@@ -0,0 +1,83 @@
+from services.index_writer import ACTION_FIELD, IndexWriter, JsonIndexTarget
+import asyncio
+
+class FlakyTarget(JsonIndexTarget):
+    # Fails the given keys with a status for their first `times` uploads
+    def __init__(self, failures:dict, times:int=1):
+        super().__init__()
+        self.failures = failures
+        self.times = times
+        self.uploads = []
+
+    async def upload(self, documents):
+        self.uploads.append([document["id"] for document in documents])
+        failed = [document for document in documents if document["id"] in self.failures and self.times > 0]
+        self.times -= 1 if failed else 0
+        results = await super().upload([document for document in documents if document not in failed])
+        return results + [(document["id"], False, self.failures[document["id"]], "failed") for document in failed]
+
+def test_only_failed_keys_are_retried():
+    target = FlakyTarget({"b": 429})
+    writer = IndexWriter(target, retry_delay=0)
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await writer.add({"id": key, "title": key})
+        await writer.flush()
+
+    asyncio.run(run())
+    assert target.uploads == [["a", "b", "c"], ["b"]]
+    assert set(target.documents) == {"a", "b", "c"}
+    assert writer.stats() == {"batches": 2, "succeeded": 3, "retried": 1, "deleted": 0, "failed": 0}
+
+def test_non_retriable_failure_is_not_retried():
+    target = FlakyTarget({"b": 400})
+    writer = IndexWriter(target, retry_delay=0)
+
+    async def run():
+        await writer.add({"id": "a"})
+        await writer.add({"id": "b"})
+        await writer.flush()
+
+    asyncio.run(run())
+    assert target.uploads == [["a", "b"]]
+    assert writer.failed == {"b": "400: failed"}
+
+def test_retries_are_bounded():
+    target = FlakyTarget({"a": 503}, times=10)
+    writer = IndexWriter(target, max_retries=2, retry_delay=0)
+
+    async def run():
+        await writer.add({"id": "a"})
+        await writer.flush()
+
+    asyncio.run(run())
+    assert len(target.uploads) == 3
+    assert writer.failed == {"a": "503: failed"}
+
+def test_batches_are_split_by_count_and_size():
+    target = FlakyTarget({})
+    writer = IndexWriter(target, max_documents=2, max_bytes=60)
+    indexed = []
+    writer.on_indexed = lambda document: indexed.append(document["id"])
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await writer.add({"id": key})
+        await writer.add({"id": "d", "text": "x" * 30})
+        # Larger than a batch
+        await writer.add({"id": "e", "text": "x" * 60})
+        await writer.delete("a")
+        await writer.flush()
+
+    asyncio.run(run())
+    assert target.uploads == [["a", "b"], ["c"], ["d"], ["a"]]
+    assert indexed == ["a", "b", "c", "d", "a"]
+    assert set(target.documents) == {"b", "c", "d"}
+    assert "e" in writer.failed
+    assert writer.stats()["deleted"] == 1
+
+def test_delete_action():
+    document = {ACTION_FIELD: "delete", "id": "a"}
+    target = JsonIndexTarget()
+    assert asyncio.run(target.upload([document])) == [("a", True, 200, None)]
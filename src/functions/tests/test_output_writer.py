@@ -0,0 +1,47 @@
+from models import Contract, ContractFields
+from request import OutputWriter, serialize_contract
+import json
+
+def contract(record_id:str, title:str="MASTER SERVICES AGREEMENT") -> Contract:
+    return Contract(recordId=record_id, data=ContractFields(title=title))
+
+def test_records_are_answered_in_the_order_of_the_request():
+    writer = OutputWriter(2)
+    writer.write(1, contract("2"))
+    writer.write(0, contract("1"))
+
+    values = json.loads(writer.body())["values"]
+    assert [value["recordId"] for value in values] == ["1", "2"]
+    assert values[0]["data"]["title"] == "MASTER SERVICES AGREEMENT"
+    assert writer.size == len(writer.body()) - len('{"values":[]}') + 1
+
+def test_record_over_the_limit_is_truncated():
+    writer = OutputWriter(2, max_bytes=1000)
+    writer.write(0, contract("1"))
+    assert not writer.full
+    writer.write(1, contract("2", title="x" * 1000))
+
+    values = json.loads(writer.body())["values"]
+    assert values[0]["data"]["title"] == "MASTER SERVICES AGREEMENT"
+    assert values[1]["data"]["title"] is None
+    assert "limited to 1000 bytes" in values[1]["errors"]["message"]
+    assert writer.truncated == 1
+
+def test_records_are_skipped_once_full():
+    size = len(serialize_contract(contract("1")))
+    writer = OutputWriter(3, max_bytes=size)
+    writer.write(0, contract("1"))
+    assert writer.full
+
+    writer.skip(1, "2")
+    writer.skip(2, "3")
+    values = json.loads(writer.body())["values"]
+    assert [value["recordId"] for value in values] == ["1", "2", "3"]
+    assert all("errors" in value and value["errors"] for value in values[1:])
+    assert writer.truncated == 2
+
+def test_no_limit():
+    writer = OutputWriter(1)
+    writer.write(0, contract("1", title="x" * 10_000))
+    assert not writer.full
+    assert writer.truncated == 0
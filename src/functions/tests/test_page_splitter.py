@@ -0,0 +1,49 @@
+from pypdf import PdfWriter
+from services.page_splitter import PageSplitter, blob_page_count, range_page_count
+import asyncio
+import io
+
+class FakeBlob:
+    def __init__(self, content:bytes):
+        self.content = content
+        self.read_bytes = 0
+
+    async def download_blob(self, offset:int, length:int):
+        self.read_bytes += length
+        data = self.content[offset:offset + length]
+
+        class Downloader:
+            async def readall(self):
+                return data
+        return Downloader()
+
+def build_pdf(pages:int, padding:int=0) -> bytes:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    if padding:
+        writer.add_metadata({"/Padding": "x" * padding})
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+def test_small_blob_is_read_once():
+    blob = FakeBlob(build_pdf(3))
+    assert asyncio.run(blob_page_count(blob, len(blob.content))) == 3
+    assert blob.read_bytes == len(blob.content)
+
+def test_large_blob_is_read_by_ranges():
+    blob = FakeBlob(build_pdf(45, padding=200_000))
+    size = len(blob.content)
+
+    assert asyncio.run(blob_page_count(blob, size, probe_bytes=16 * 1024)) == 45
+    assert blob.read_bytes <= 2 * 16 * 1024
+
+def test_page_ranges():
+    splitter = PageSplitter(pages_per_range=20, min_pages=40, max_ranges=2)
+
+    assert splitter.page_ranges(None) == [None]
+    assert splitter.page_ranges(39) == [None]
+    assert splitter.page_ranges(45) == ["1-23", "24-45"]
+    assert range_page_count("24-45") == 22
+    assert splitter.stats() == {"split_documents": 1, "ranges": 2}
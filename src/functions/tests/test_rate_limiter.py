@@ -0,0 +1,118 @@
+from services.rate_limiter import AdaptiveRateLimiter, ThrottlingFeedbackPolicy, get_retry_after
+from types import SimpleNamespace
+import asyncio
+import time
+
+def throttled_response(status_code:int=429, headers:dict=None):
+    return SimpleNamespace(http_response=SimpleNamespace(status_code=status_code, headers=headers or {}))
+
+def test_limit_grows_on_success():
+    limiter = AdaptiveRateLimiter(initial_limit=2, max_limit=3)
+
+    async def run():
+        for _ in range(10):
+            async with limiter.slot():
+                pass
+
+    asyncio.run(run())
+    assert limiter.limit == 3
+    assert limiter.in_flight == 0
+
+def test_failure_does_not_grow_the_limit():
+    limiter = AdaptiveRateLimiter(initial_limit=2)
+
+    async def run():
+        try:
+            async with limiter.slot():
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+
+    asyncio.run(run())
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
+
+def test_throttling_shrinks_the_limit_once_per_window():
+    limiter = AdaptiveRateLimiter(initial_limit=8, min_limit=1)
+
+    limiter.on_throttled(10)
+    limiter.on_throttled(10)
+    assert limiter.limit == 4
+    assert limiter.throttled == 2
+
+    for _ in range(5):
+        limiter._last_decrease = 0
+        limiter.on_throttled(0.01)
+    assert limiter.limit == 1
+
+def test_in_flight_is_capped_by_the_limit():
+    limiter = AdaptiveRateLimiter(initial_limit=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
+
+def test_throttling_pauses_new_operations():
+    limiter = AdaptiveRateLimiter(initial_limit=4)
+    limiter.on_throttled(0.1)
+
+    async def run():
+        start = time.monotonic()
+        async with limiter.slot():
+            return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.09
+
+def test_token_bucket_paces_the_submissions():
+    limiter = AdaptiveRateLimiter(initial_limit=10, requests_per_second=20)
+
+    async def run():
+        start = time.monotonic()
+        # The bucket starts full with one second of requests
+        for _ in range(25):
+            async with limiter.slot():
+                pass
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.2
+
+def test_feedback_policy_reports_throttled_responses():
+    limiter = AdaptiveRateLimiter(initial_limit=8)
+    policy = ThrottlingFeedbackPolicy(limiter)
+
+    policy.on_response(None, throttled_response(200))
+    assert limiter.throttled == 0
+
+    policy.on_response(None, throttled_response(429, {"Retry-After": "2"}))
+    assert limiter.throttled == 1
+    assert limiter.limit == 4
+
+def test_retry_after_headers():
+    assert get_retry_after(throttled_response(headers={"retry-after-ms": "1500"})) == 1.5
+    assert get_retry_after(throttled_response(headers={"Retry-After": "3"})) == 3
+    assert get_retry_after(throttled_response(headers={"Retry-After": "Thu, 01 Jan 1970 00:00:00 GMT"})) == 0
+    assert get_retry_after(throttled_response(headers={"Retry-After": "soon"})) is None
+    assert get_retry_after(throttled_response()) is None
+
+def test_saturated_at_the_limit_or_paused():
+    limiter = AdaptiveRateLimiter(initial_limit=1)
+    assert not limiter.saturated
+
+    async def run():
+        async with limiter.slot():
+            return limiter.saturated
+
+    assert asyncio.run(run())
+    assert not limiter.saturated
+
+    limiter.on_throttled(10)
+    assert limiter.saturated
@@ -0,0 +1,47 @@
+from models import ContractFields
+from services.result_cache import MemoryResultCache, SqliteResultCache
+import asyncio
+import time
+
+def test_memory_cache_evicts_the_least_recently_used():
+    cache = MemoryResultCache(max_entries=2)
+
+    async def run():
+        await cache.set("a", ContractFields(title="A"))
+        await cache.set("b", ContractFields(title="B"))
+        await cache.get("a")
+        await cache.set("c", ContractFields(title="C"))
+        return await cache.get("a"), await cache.get("b")
+
+    a, b = asyncio.run(run())
+    assert a.title == "A"
+    assert b is None
+    assert cache.stats() == {"hits": 2, "misses": 1, "size": 2}
+
+def test_expired_entries_are_misses(monkeypatch):
+    cache = MemoryResultCache(ttl_seconds=10)
+    asyncio.run(cache.set("a", ContractFields(title="A")))
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert asyncio.run(cache.get("a")) is None
+
+def test_sqlite_cache_keeps_the_confidence_and_its_size(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SqliteResultCache(path)
+
+    async def run():
+        await cache.set("a", ContractFields(title="A", confidence={"Title": 0.9}))
+        await cache.set("a", ContractFields(title="A2"))
+        await cache.set("b", ContractFields(title="B", confidence={"Title": 0.5}))
+        return await cache.get("b")
+
+    b = asyncio.run(run())
+    assert b.confidence == {"Title": 0.5}
+    assert cache.stats()["size"] == 2
+    asyncio.run(cache.close())
+
+    # Counted again when the file is opened
+    reopened = SqliteResultCache(path)
+    assert reopened.stats()["size"] == 2
+    asyncio.run(reopened.close())
@@ -0,0 +1,68 @@
+from services.single_flight import SingleFlight
+import asyncio
+import pytest
+
+def test_concurrent_callers_share_one_flight():
+    flight = SingleFlight()
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "fields"
+
+    async def run():
+        return await asyncio.gather(*(flight.do("name:a.pdf", call) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert calls == 1
+    assert [shared for _, shared in results] == [False, True, True, True, True]
+    assert all(result == "fields" for result, _ in results)
+    assert flight.stats() == {"mode": "name", "started": 1, "shared": 4, "in_flight": 0}
+
+def test_failure_is_shared_and_forgotten():
+    flight = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("analysis failed")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("name:a.pdf", call) for _ in range(2)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(run()))
+    assert flight.stats()["in_flight"] == 0
+
+def test_cancelled_caller_does_not_cancel_the_flight():
+    flight = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.05)
+        return "fields"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("name:a.pdf", call))
+        second = asyncio.ensure_future(flight.do("name:a.pdf", call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == ("fields", True)
+
+def test_sequential_calls_start_new_flights():
+    flight = SingleFlight()
+
+    async def call():
+        return "fields"
+
+    async def run():
+        await flight.do("name:a.pdf", call)
+        return await flight.do("name:a.pdf", call)
+
+    assert asyncio.run(run()) == ("fields", False)
+    assert flight.stats()["started"] == 2
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        SingleFlight("hash")